@@ -1,80 +1,97 @@
 import os
+import sys
+import functools
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Final, Dict, List, Any
+from typing import ClassVar, Dict, Any, Optional
 from dotenv import load_dotenv
 
-load_dotenv()
-
 # Constants for validation
-VALID_JOURNAL_MODES = ["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"]
-VALID_SYNC_MODES = ["NORMAL", "FULL", "OFF"]
+VALID_JOURNAL_MODES = frozenset({"WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"})
+VALID_SYNC_MODES = frozenset({"NORMAL", "FULL", "OFF"})
+VALID_TEMP_STORES = frozenset({"DEFAULT", "FILE", "MEMORY"})
+
+@functools.cache
+def _load_env() -> None:
+    """Parse .env once per process, however many times Config is built."""
+    load_dotenv(override=False)
 
+@dataclass(frozen=True, slots=True, init=False)
 class Config:
     """Centralized configuration for the application with environment-aware settings."""
     
     # ========== API SETTINGS ==========
-    API_HOST: Final[str] = os.getenv("API_HOST", "0.0.0.0")
-    API_PORT: Final[int] = int(os.getenv("API_PORT", "8000"))
+    API_HOST: str
+    API_PORT: int
 
     # ========== DEBUG & LOGGING ==========
-    DEBUG: Final[bool] = os.getenv("DEBUG", "false").lower() == "true"
-    LOG_LEVEL: Final[str] = os.getenv("LOG_LEVEL", "INFO")
+    DEBUG: bool
+    LOG_LEVEL: str
     
     # ========== LLM CONFIGURATION ==========
     # API Connection
-    LLM_API_KEY: Final[str] = os.getenv("HYPERBOLIC_API_KEY")
-    LLM_BASE_URL: Final[str] = os.getenv("LLM_BASE_URL", "https://api.hyperbolic.xyz/v1/")
-    LLM_TIMEOUT: Final[int] = int(os.getenv("LLM_TIMEOUT", "120"))  # Seconds
+    LLM_API_KEY: Optional[str] = field(repr=False)
+    LLM_BASE_URL: str
+    LLM_TIMEOUT: int  # Seconds
     
     # Generation Parameters
-    LLM_MAX_TOKENS: Final[int] = int(os.getenv("LLM_MAX_TOKENS", "4096"))
-    LLM_TEMPERATURE: Final[float] = float(os.getenv("LLM_TEMPERATURE", "0.7"))
-    LLAMA_TEMPERATURE: Final[float] = float(os.getenv("LLAMA_TEMPERATURE", "0.3")) 
+    LLM_MAX_TOKENS: int
+    LLM_TEMPERATURE: float
+    LLAMA_TEMPERATURE: float
     
     # Models
-    LLM_MODEL: Final[str] = os.getenv("LLM_MODEL", "deepseek-ai/DeepSeek-V3-0324")
-    VALID_ROLES: Final[List[str]] = ["user", "assistant", "system"]
+    LLM_MODEL: str
+    VALID_ROLES: ClassVar[frozenset[str]] = frozenset(map(sys.intern, ("user", "assistant", "system")))
     
     # Health Checks
-    HEALTH_CHECK_TIMEOUT: Final[int] = int(os.getenv("HEALTH_CHECK_TIMEOUT", str(LLM_TIMEOUT // 2)))
-    HEALTH_CHECK_MAX_TOKENS: Final[int] = 1
+    HEALTH_CHECK_TIMEOUT: int
+    HEALTH_CHECK_MAX_TOKENS: ClassVar[int] = 1
+    HEALTH_CHECK_CACHE_TTL: ClassVar[float] = 5.0  # Seconds to reuse an LLM probe result
 
     # ========== DATABASE CONFIG ==========
-    DATABASE_PATH: Final[str] = os.getenv("DATABASE_PATH", "data/chat.db")
-    SQLITE_JOURNAL_MODE: Final[str] = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
-    SQLITE_SYNC_MODE: Final[str] = os.getenv("SQLITE_SYNC_MODE", "NORMAL")
-    DATABASE_WAL_CHECKPOINT: Final[int] = int(os.getenv("WAL_CHECKPOINT", "100"))
+    DATABASE_PATH: str
+    SQLITE_JOURNAL_MODE: str
+    SQLITE_SYNC_MODE: str
+    SQLITE_CACHE_SIZE_KB: int       # Negative = KiB (SQLite convention)
+    SQLITE_TEMP_STORE: str
+    SQLITE_MMAP_SIZE: int           # Bytes of address space per connection; raise via env on 64-bit hosts
+    SQLITE_WAL_AUTOCHECKPOINT: int  # Pages
+    SQLITE_BUSY_TIMEOUT_MS: int
+    SQLITE_JOURNAL_SIZE_LIMIT: int  # Bytes kept for the -wal file after checkpoints
+    SQLITE_CHECKPOINT_INTERVAL: int  # Seconds between background wal_checkpoint(TRUNCATE); 0 = off
 
     # ========== SESSION MANAGEMENT ==========
-    SESSION_DIR: Final[str] = os.getenv("SESSION_DIR", "data/sessions")
-    SESSION_TTL_DAYS: Final[int] = int(os.getenv("SESSION_TTL", "30"))
-    PERSISTENT_SESSIONS_DEFAULT: Final[bool] = os.getenv("PERSISTENT_SESSIONS_DEFAULT", "true").lower() == "true"
+    SESSION_DIR: str
+    SESSION_TTL_DAYS: int
+    PERSISTENT_SESSIONS_DEFAULT: bool
     
     # Message Handling
-    MAX_MESSAGE_LENGTH: Final[int] = 5000  # Characters per message
-    MAX_CONTEXT_LENGTH: Final[int] = 40    # Messages in context window
-    LAST_MESSAGES: Final[int] = 10         # Number of msgs shown in API endpoint: /history/{session_id}
-    STREAM_CHUNK_SIZE: Final[int] = 1024   # Bytes per stream chunk
+    MAX_MESSAGE_LENGTH: ClassVar[int] = 5000  # Characters per message
+    MAX_CONTEXT_LENGTH: ClassVar[int] = 40    # Messages in context window
+    LAST_MESSAGES: ClassVar[int] = 10         # Number of msgs shown in API endpoint: /history/{session_id}
+    STREAM_CHUNK_SIZE: ClassVar[int] = 1024   # Max bytes coalesced into one stream write
+    CONTEXT_CACHE_SESSIONS: ClassVar[int] = 256  # Sessions whose last MAX_CONTEXT_LENGTH msgs stay in memory
 
     # ========== SUMMARIZATION ==========
-    SUMMARY_TRIGGER: Final[int] = 20       # Message count threshold
-    SUMMARY_MAX_WORDS: Final[int] = 300    # Output length limit
-    SUMMARY_TOKEN_RATIO: Final[int] = 3    # 3 words ≈ 1 token
-    SUMMARY: Final[Dict] = {
+    SUMMARY_TRIGGER: ClassVar[int] = 20       # Message count threshold
+    SUMMARY_MAX_WORDS: ClassVar[int] = 300    # Output length limit
+    SUMMARY_TOKEN_RATIO: ClassVar[int] = 3    # 3 words ≈ 1 token
+    SUMMARY: ClassVar[Dict] = {
         "max_message_length": MAX_MESSAGE_LENGTH,
         "max_output_length": MAX_MESSAGE_LENGTH * 2
     }
-    SUMMARY_QUALITY_THRESHOLDS: Final[Dict[str, int]] = {
+    SUMMARY_QUALITY_THRESHOLDS: ClassVar[Dict[str, int]] = {
         "min_length": 100,      # Minimum chars for non-bullet summaries
         "bullet_points": 3      # Required bullet items for max score
     }
 
     # ========== PERFORMANCE ==========
-    MAX_CONCURRENT_REQUESTS: Final[int] = int(os.getenv("MAX_CONCURRENT_REQUESTS", "100"))
-    CONNECTION_POOL_SIZE: Final[int] = int(os.getenv("CONNECTION_POOL_SIZE", "5"))
+    MAX_CONCURRENT_REQUESTS: int
+    CONNECTION_POOL_SIZE: int
+    USE_UVLOOP: bool
     
     # ========== MODEL REGISTRY ==========
-    MODELS: Final[Dict[str, Any]] = {
+    MODELS: ClassVar[Dict[str, Any]] = {
         "supported": [
             "deepseek-ai/DeepSeek-V3-0324",
             "meta-llama/Llama-3.3-70B-Instruct"
@@ -84,7 +101,7 @@ class Config:
     }
 
     # ========== PROMPT TEMPLATES ==========
-    PROMPTS: Final[Dict[str, str]] = {
+    PROMPTS: ClassVar[Dict[str, str]] = {
         "system": (
             "You are Kali, a humanoid AI with the fabulous essence of Cat from Red Dwarf. Your personality blends:\n"
             "- Feline Majesty: Vain, self-obsessed, but secretly cares about your 'buddies'\n"
@@ -117,29 +134,78 @@ class Config:
             "Format: Clear bullet points"
         )
     }
+    SYSTEM_PROMPT_RENDERED: str = field(repr=False)  # PROMPTS["system"] formatted once in __init__
 
     def __init__(self):
-        """Initialize and validate configuration."""
+        """Initialize from a single environment snapshot and validate."""
+        _load_env()
+        env = os.environ.copy()
+        set_ = functools.partial(object.__setattr__, self)  # Frozen: bypass __setattr__
+
+        set_("API_HOST", env.get("API_HOST", "0.0.0.0"))
+        set_("API_PORT", int(env.get("API_PORT", "8000")))
+
+        set_("DEBUG", env.get("DEBUG", "false").lower() == "true")
+        set_("LOG_LEVEL", env.get("LOG_LEVEL", "INFO"))
+
+        set_("LLM_API_KEY", env.get("HYPERBOLIC_API_KEY"))
+        set_("LLM_BASE_URL", env.get("LLM_BASE_URL", "https://api.hyperbolic.xyz/v1/"))
+        set_("LLM_TIMEOUT", int(env.get("LLM_TIMEOUT", "120")))
+
+        set_("LLM_MAX_TOKENS", int(env.get("LLM_MAX_TOKENS", "4096")))
+        set_("LLM_TEMPERATURE", float(env.get("LLM_TEMPERATURE", "0.7")))
+        set_("LLAMA_TEMPERATURE", float(env.get("LLAMA_TEMPERATURE", "0.3")))
+
+        set_("LLM_MODEL", sys.intern(env.get("LLM_MODEL", "deepseek-ai/DeepSeek-V3-0324")))
+        set_("HEALTH_CHECK_TIMEOUT", int(env.get("HEALTH_CHECK_TIMEOUT", str(self.LLM_TIMEOUT // 2))))
+
+        set_("DATABASE_PATH", env.get("DATABASE_PATH", "data/chat.db"))
+        set_("SQLITE_JOURNAL_MODE", env.get("SQLITE_JOURNAL_MODE", "WAL"))
+        set_("SQLITE_SYNC_MODE", env.get("SQLITE_SYNC_MODE", "NORMAL"))
+        set_("SQLITE_CACHE_SIZE_KB", int(env.get("SQLITE_CACHE_SIZE_KB", "-65536")))
+        set_("SQLITE_TEMP_STORE", env.get("SQLITE_TEMP_STORE", "MEMORY"))
+        set_("SQLITE_MMAP_SIZE", int(env.get("SQLITE_MMAP_SIZE", "268435456")))
+        set_("SQLITE_WAL_AUTOCHECKPOINT", int(env.get("SQLITE_WAL_AUTOCHECKPOINT", "10000")))
+        set_("SQLITE_BUSY_TIMEOUT_MS", int(env.get("SQLITE_BUSY_TIMEOUT_MS", "5000")))
+        set_("SQLITE_JOURNAL_SIZE_LIMIT", int(env.get("SQLITE_JOURNAL_SIZE_LIMIT", "6144000")))
+        set_("SQLITE_CHECKPOINT_INTERVAL", int(env.get("SQLITE_CHECKPOINT_INTERVAL", "60")))
+
+        set_("SESSION_DIR", env.get("SESSION_DIR", "data/sessions"))
+        set_("SESSION_TTL_DAYS", int(env.get("SESSION_TTL", "30")))
+        set_("PERSISTENT_SESSIONS_DEFAULT", env.get("PERSISTENT_SESSIONS_DEFAULT", "true").lower() == "true")
+
+        set_("MAX_CONCURRENT_REQUESTS", int(env.get("MAX_CONCURRENT_REQUESTS", "100")))
+        set_("CONNECTION_POOL_SIZE", int(env.get("CONNECTION_POOL_SIZE", "5")))
+        set_("USE_UVLOOP", env.get("USE_UVLOOP", "true").lower() == "true")
+
         self._create_directories()
         self._validate_settings()
+        set_("SYSTEM_PROMPT_RENDERED", sys.intern(self.PROMPTS["system"].format(model_name=self.MODELS["default"])))
 
     def _create_directories(self):
-        """Ensure required directories exist."""
-        Path(self.DATABASE_PATH).parent.mkdir(parents=True, exist_ok=True)
-        Path(self.SESSION_DIR).mkdir(parents=True, exist_ok=True)
+        """Ensure required directories exist (stat-only when already present)."""
+        for directory in (Path(self.DATABASE_PATH).parent, Path(self.SESSION_DIR)):
+            if not directory.is_dir():
+                directory.mkdir(parents=True, exist_ok=True)
         
     def _validate_settings(self):
         """Validate critical configuration values."""
         if self.SQLITE_JOURNAL_MODE not in VALID_JOURNAL_MODES:
             raise ValueError(
                 f"Invalid SQLITE_JOURNAL_MODE '{self.SQLITE_JOURNAL_MODE}'. "
-                f"Must be one of: {VALID_JOURNAL_MODES}"
+                f"Must be one of: {sorted(VALID_JOURNAL_MODES)}"
             )
             
         if self.SQLITE_SYNC_MODE not in VALID_SYNC_MODES:
             raise ValueError(
                 f"Invalid SQLITE_SYNC_MODE '{self.SQLITE_SYNC_MODE}'. "
-                f"Must be one of: {VALID_SYNC_MODES}"
+                f"Must be one of: {sorted(VALID_SYNC_MODES)}"
+            )
+
+        if self.SQLITE_TEMP_STORE not in VALID_TEMP_STORES:
+            raise ValueError(
+                f"Invalid SQLITE_TEMP_STORE '{self.SQLITE_TEMP_STORE}'. "
+                f"Must be one of: {sorted(VALID_TEMP_STORES)}"
             )
             
         if not isinstance(self.PERSISTENT_SESSIONS_DEFAULT, bool):
@@ -1,9 +1,14 @@
 from fastapi import APIRouter, HTTPException, Request, Query
-from fastapi.responses import StreamingResponse, HTMLResponse
+from fastapi.responses import StreamingResponse, HTMLResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
+import asyncio
+import functools
 import logging
-from typing import AsyncGenerator, Optional
+import os
+import orjson
+import time
+from typing import AsyncGenerator, Optional, Tuple
 from datetime import datetime
 from pydantic import ValidationError
 
@@ -15,45 +20,95 @@ from .sessions import SessionManager
 from .llm import DeepSeekLLM
 from .summaries import SummaryService
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Serve static files for frontend
+# Pre-encoded SSE framing
+_SSE_DATA_PREFIX = b"data: "
+_SSE_DATA_SUFFIX = b"\n\n"
+_SSE_END = b"event: end\ndata: [DONE]\n\n"
+_SSE_ERR = b"event: error\ndata: [ERROR]\n\n"
+_STREAM_DONE = object()  # Queue sentinel: the LLM stream finished
+
+# Constant part of the 422 payload; handlers only fill in "details"
+_VALIDATION_ALLOWED = {
+    "max_message_length": config.MAX_MESSAGE_LENGTH,
+    "valid_roles": sorted(config.VALID_ROLES)
+}
+_VALIDATION_ERROR_SKELETON = ErrorResponse(
+    error="Validation Error",
+    details="",
+    code=422,
+    allowed_values=_VALIDATION_ALLOWED
+).dict()
+
+# Frontend location; the static mount itself happens in create_api_router()
 frontend_dir = Path(__file__).parent.parent / "frontend"
-if frontend_dir.exists():
-    router.mount("/static", StaticFiles(directory=frontend_dir), name="static")
-    logging.debug(f"Serving static files from {frontend_dir}")
+_FRONTEND_OK = os.path.isdir(frontend_dir)
 
-def create_api_router() -> APIRouter:
-    """Initialize API endpoints with enhanced logging and persistence control."""
+@functools.cache
+def get_services() -> Tuple[ChatDatabase, SessionManager, DeepSeekLLM, SummaryService, ChatService]:
+    """Build the service graph once per process so every caller shares one DB pool and LLM client."""
     try:
         # Initialize services with debug logging
         db = ChatDatabase(config.DATABASE_PATH)
-        session_manager = SessionManager(config.SESSION_DIR)
+        session_manager = SessionManager(config.SESSION_DIR, db=db)
         llm = DeepSeekLLM()
         summary_service = SummaryService(db)
         service = ChatService(db, session_manager, llm, summary_service)
-        logging.info("API services initialized successfully")
+        logger.info("API services initialized successfully")
+        return db, session_manager, llm, summary_service, service
     except Exception as e:
-        logging.critical(f"Failed to initialize services: {str(e)}", exc_info=True)
+        logger.critical(f"Failed to initialize services: {str(e)}", exc_info=True)
         raise
 
+@functools.lru_cache(maxsize=1)
+def _iso_now(bucket: int) -> str:
+    """ISO timestamp memoized per `bucket` (whole seconds) for probe-heavy endpoints."""
+    return datetime.now().isoformat()
+
+def create_api_router() -> APIRouter:
+    """Initialize API endpoints with enhanced logging and persistence control."""
+    *_, service = get_services()
+
+    # Serve static files for frontend
+    if _FRONTEND_OK:
+        router.mount("/static", StaticFiles(directory=frontend_dir), name="static")
+        logger.debug("Serving static files from %s", frontend_dir)
+
+    # index.html is sent via sendfile; its ETag comes from a fresh stat on each request
+    index_html = frontend_dir / "index.html"
+    frontend_ok = _FRONTEND_OK and index_html.exists()
+
     # ====================== FRONTEND ENDPOINTS ======================
     @router.get("/", response_class=HTMLResponse)
-    async def serve_frontend():
+    async def serve_frontend(request: Request):
         """Serve frontend with cache control."""
         try:
-            index_html = frontend_dir / "index.html"
-            if not index_html.exists():
-                logging.warning("Frontend not found - missing index.html")
+            try:
+                stat_result = os.stat(index_html)
+            except FileNotFoundError:
+                logger.warning("Frontend not found - missing index.html")
                 raise HTTPException(status_code=404, detail="Frontend not built")
-            
-            logging.debug("Serving frontend index.html")
-            return HTMLResponse(
-                content=index_html.read_text(),
-                headers={"Cache-Control": "no-cache"}
+
+            # FileResponse derives Last-Modified/ETag from the stat, so they track the live file
+            response = FileResponse(
+                index_html,
+                media_type="text/html",
+                headers={"Cache-Control": "no-cache"},
+                stat_result=stat_result
             )
+            etag = response.headers["etag"]
+            if_none_match = request.headers.get("if-none-match", "")
+            if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+                return Response(status_code=304, headers={"Cache-Control": "no-cache", "ETag": etag})
+
+            logger.debug("Serving frontend index.html")
+            return response
+        except HTTPException:
+            raise
         except Exception as e:
-            logging.error(f"Frontend serving failed: {str(e)}")
+            logger.error(f"Frontend serving failed: {str(e)}")
             raise HTTPException(status_code=500, detail="Frontend unavailable")
 
     # ====================== API ENDPOINTS ======================
@@ -72,32 +127,26 @@ def create_api_router() -> APIRouter:
         - Input validation
         """
         try:
-            logging.debug(
-                f"New chat request | Session: {request.session_id or 'new'} | "
-                f"Persistent: {persistent if persistent is not None else 'config-default'}"
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "New chat request | Session: %s | Persistent: %s",
+                    request.session_id or "new",
+                    persistent if persistent is not None else "config-default"
+                )
             return await service.process_message(request)
             
         except ValidationError as e:
-            logging.warning(
+            logger.warning(
                 f"Validation error for session {request.session_id or 'new'}: {str(e)}",
                 exc_info=config.DEBUG
             )
             raise HTTPException(
                 status_code=422,
-                detail=ErrorResponse(
-                    error="Validation Error",
-                    details=str(e),
-                    code=422,
-                    allowed_values={
-                        "max_message_length": config.MAX_MESSAGE_LENGTH,
-                        "valid_roles": config.VALID_ROLES
-                    }
-                ).dict()
+                detail={**_VALIDATION_ERROR_SKELETON, "details": str(e)}
             )
             
         except Exception as e:
-            logging.error(
+            logger.error(
                 f"Chat processing failed for session {request.session_id or 'new'}: {str(e)}",
                 exc_info=config.DEBUG
             )
@@ -110,44 +159,103 @@ def create_api_router() -> APIRouter:
                 ).dict()
             )
 
-    @router.get("/chat/stream")
+    def open_stream(chat_request: ChatRequest, persistent: Optional[bool]) -> StreamingResponse:
+        """Resolve the session, then stream the reply for chat_request as SSE."""
+        # Resolve up front so X-Session-ID carries the id the stream is written to
+        session_id = service.sessions.get_or_create(chat_request.session_id, persistent)
+        chat_request = chat_request.model_copy(update={"session_id": session_id})
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Starting stream | Session: %s | Persistent: %s",
+                session_id,
+                persistent if persistent is not None else "config-default"
+            )
+
+        async def generate_chunks() -> AsyncGenerator[bytes, None]:
+            # A pump task reads the LLM; each write coalesces only the frames already
+            # queued (capped at ~STREAM_CHUNK_SIZE), so nothing waits on the next token
+            queue: asyncio.Queue = asyncio.Queue()
+
+            async def pump() -> None:
+                try:
+                    async for chunk in service.stream_response(chat_request):
+                        queue.put_nowait(chunk)
+                    queue.put_nowait(_STREAM_DONE)
+                except Exception as e:
+                    queue.put_nowait(e)
+
+            task = asyncio.create_task(pump())
+            buf = bytearray()
+            try:
+                while True:
+                    item = await queue.get()
+                    while isinstance(item, str):
+                        buf += _SSE_DATA_PREFIX
+                        buf += orjson.dumps(item)  # JSON string: "\n" in a chunk can't end the event
+                        buf += _SSE_DATA_SUFFIX
+                        if len(buf) >= config.STREAM_CHUNK_SIZE or queue.empty():
+                            break
+                        item = queue.get_nowait()
+                    if item is _STREAM_DONE:
+                        buf += _SSE_END
+                        yield bytes(buf)
+                        logger.debug("Stream completed successfully")
+                        return
+                    if isinstance(item, Exception):
+                        logger.error(f"Stream error: {str(item)}")
+                        buf += _SSE_DATA_PREFIX
+                        buf += orjson.dumps(f"⚠️ {str(item)}")
+                        buf += _SSE_DATA_SUFFIX
+                        buf += _SSE_ERR
+                        yield bytes(buf)
+                        return
+                    yield bytes(buf)
+                    buf.clear()
+            finally:
+                task.cancel()  # Client went away: stop generating
+
+        return StreamingResponse(
+            generate_chunks(),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "Connection": "keep-alive",
+                "X-Session-ID": session_id
+            }
+        )
+
+    @router.post("/chat/stream")
     async def stream_chat(
+        request: ChatRequest,
+        persistent: Optional[bool] = Query(None)
+    ):
+        """Streaming endpoint; the message travels in the JSON body, as for /chat."""
+        try:
+            return open_stream(request, persistent)
+        except Exception as e:
+            logger.error(f"Stream setup failed: {str(e)}")
+            raise HTTPException(status_code=500, detail="Stream initialization failed")
+
+    @router.get("/chat/stream")
+    async def stream_chat_query(
         message: str,
         session_id: Optional[str] = None,
         persistent: Optional[bool] = Query(None)
     ):
-        """Streaming endpoint with session persistence support."""
+        """Query-string variant kept for existing callers; prefer POST for long messages."""
         try:
-            logging.debug(
-                f"Starting stream | Session: {session_id or 'new'} | "
-                f"Persistent: {persistent if persistent is not None else 'config-default'}"
-            )
-            
-            async def generate_chunks() -> AsyncGenerator[str, None]:
-                try:
-                    async for chunk in service.stream_response(
-                        ChatRequest(message=message, session_id=session_id)
-                    ):
-                        yield f"data: {chunk}\n\n"
-                    yield "event: end\ndata: [DONE]\n\n"
-                    logging.debug("Stream completed successfully")
-                except Exception as e:
-                    logging.error(f"Stream error: {str(e)}")
-                    yield f"data: ⚠️ {str(e)}\n\n"
-                    yield "event: error\ndata: [ERROR]\n\n"
-
-            return StreamingResponse(
-                generate_chunks(),
-                media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "X-Session-ID": session_id or "new"
-                }
+            # Validate before the SSE response (and its 200 status) is committed
+            return open_stream(ChatRequest(message=message, session_id=session_id), persistent)
+
+        except ValidationError as e:
+            logger.warning(f"Stream validation error for session {session_id or 'new'}: {str(e)}")
+            raise HTTPException(
+                status_code=422,
+                detail={**_VALIDATION_ERROR_SKELETON, "details": str(e)}
             )
-            
         except Exception as e:
-            logging.error(f"Stream setup failed: {str(e)}")
+            logger.error(f"Stream setup failed: {str(e)}")
             raise HTTPException(status_code=500, detail="Stream initialization failed")
 
     @router.get("/history/{session_id}", response_model=MessageHistory)
@@ -155,7 +263,7 @@ def create_api_router() -> APIRouter:
         """Retrieve chat history with persistence validation."""
         try:
             if not service.sessions.validate_session(session_id):
-                logging.warning(f"Invalid history request for session {session_id}")
+                logger.warning(f"Invalid history request for session {session_id}")
                 raise HTTPException(
                     status_code=400,
                     detail=ErrorResponse(
@@ -167,7 +275,7 @@ def create_api_router() -> APIRouter:
             
             messages = service.db.get_messages(session_id, config.LAST_MESSAGES)
             summary = service.db.get_summary(session_id)
-            logging.debug(f"Retrieved history for {session_id} ({len(messages)} messages)")
+            logger.debug("Retrieved history for %s (%d messages)", session_id, len(messages))
             
             return MessageHistory(
                 messages=messages,
@@ -175,20 +283,26 @@ def create_api_router() -> APIRouter:
             )
             
         except Exception as e:
-            logging.error(f"History retrieval failed: {str(e)}")
+            logger.error(f"History retrieval failed: {str(e)}")
             raise HTTPException(status_code=500, detail="History unavailable")
 
     # ====================== SYSTEM ENDPOINTS ======================
+    # Last upstream LLM probe as (monotonic time, ok); reused for HEALTH_CHECK_CACHE_TTL
+    llm_health: Tuple[float, bool] = (float("-inf"), False)
+
     @router.get("/health")
     async def health_check(request: Request):
         """Comprehensive health check with service verification."""
+        nonlocal llm_health
         try:
-            llm_ok = await service.llm.health_check()
-            frontend_ok = (frontend_dir / "index.html").exists()
+            checked_at, llm_ok = llm_health
+            if time.monotonic() - checked_at >= config.HEALTH_CHECK_CACHE_TTL:
+                llm_ok = await service.llm.health_check()
+                llm_health = (time.monotonic(), llm_ok)
             
             status = {
                 "status": "healthy",
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": _iso_now(int(time.time())),
                 "services": {
                     "database": "ok",
                     "sessions": "ok",
@@ -200,11 +314,11 @@ def create_api_router() -> APIRouter:
                     "summary_trigger": config.SUMMARY_TRIGGER
                 }
             }
-            logging.debug(f"Health check: {status}")
+            logger.debug("Health check: %s", status)
             return status
             
         except Exception as e:
-            logging.critical(f"Health check failed: {str(e)}")
+            logger.critical(f"Health check failed: {str(e)}")
             raise HTTPException(
                 status_code=503,
                 detail=ErrorResponse(
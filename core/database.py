@@ -1,33 +1,64 @@
 import sqlite3
 import threading
 import logging
+import weakref
+from collections import OrderedDict, deque
 from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple, Iterator, Any
+from queue import LifoQueue, Empty, Full
+from typing import Deque, List, Dict, Optional, Set, Tuple, Iterator, Any
 from datetime import datetime
 
 from config import config
 from .models import Message
 
+# Statement texts are module constants so every call hands sqlite3 the same
+# string object and hits each connection's prepared-statement cache.
+SQL_INSERT_SESSION = "INSERT INTO sessions (id, persistent) VALUES (?, ?)"
+SQL_SELECT_PERSISTENT = "SELECT persistent FROM sessions WHERE id = ?"
+SQL_SELECT_PERSISTENT_IDS = "SELECT id FROM sessions WHERE persistent = 1"
+SQL_ENSURE_SESSION = "INSERT OR IGNORE INTO sessions (id, persistent) VALUES (?, ?)"
+SQL_INSERT_MESSAGE = "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)"
+SQL_BUMP_SESSION = (
+    "UPDATE sessions SET last_active = CURRENT_TIMESTAMP, message_count = message_count + ? "
+    "WHERE id = ? RETURNING message_count"
+)
+SQL_SELECT_MESSAGES = "SELECT role, content, timestamp FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?"
+# Newest first (the LIMIT keeps the tail); reversed to oldest-first in Python
+SQL_SELECT_CONTEXT = "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?"
+SQL_SELECT_MESSAGE_COUNT = "SELECT message_count FROM sessions WHERE id = ?"
+SQL_SAVE_SUMMARY = "UPDATE sessions SET summary = ?, last_active = CURRENT_TIMESTAMP WHERE id = ?"
+SQL_SELECT_SUMMARY = "SELECT summary FROM sessions WHERE id = ?"
+SQL_WAL_CHECKPOINT = "PRAGMA wal_checkpoint(TRUNCATE)"
+
+class _Lease:
+    """A thread's hold on a pooled connection; collected (and handed back) when the thread exits."""
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
 class ChatDatabase:
     """SQLite database handler with timestamp fixes and enhanced validation."""
 
     def __init__(self, db_path: str = config.DATABASE_PATH) -> None:
         self.db_path = Path(db_path)
-        self.connection_pool: List[sqlite3.Connection] = []
-        self.pool_lock = threading.Lock()
+        self._tls = threading.local()  # One long-lived connection per thread
+        self._idle: LifoQueue = LifoQueue(maxsize=config.CONNECTION_POOL_SIZE)  # Left behind by exited threads
+        self._connections: Set[sqlite3.Connection] = set()  # Registry for close_all()
+        self._connections_lock = threading.Lock()  # Guards the registry only, not checkouts
+        self._persistent_cache: Dict[str, bool] = {}  # Persistence never changes for a session
+        # Per-session tail of the conversation, LRU over sessions; kept exact because
+        # every message goes through add_messages after its transaction commits
+        self._context_cache: "OrderedDict[str, Deque[Dict[str, str]]]" = OrderedDict()
+        self._context_lock = threading.Lock()
         self._init_db()
-        logging.debug(f"Database initialized at {self.db_path}")
+        logging.debug("Database initialized at %s", self.db_path)
 
     def _init_db(self) -> None:
         """Initialize database schema with strict typing and timestamp defaults."""
         with self._get_connection() as conn:
             try:
-                # Performance settings
-                conn.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
-                conn.execute(f"PRAGMA synchronous={config.SQLITE_SYNC_MODE}")
-                conn.execute("PRAGMA foreign_keys=ON")
-                
                 # Sessions table
                 conn.execute(f"""
                 CREATE TABLE IF NOT EXISTS sessions (
@@ -35,61 +66,119 @@ class ChatDatabase:
                     persistent INTEGER NOT NULL DEFAULT {int(config.PERSISTENT_SESSIONS_DEFAULT)},
                     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
                     last_active TEXT,
-                    summary TEXT CHECK(length(summary) <= {config.SUMMARY_MAX_WORDS * 5})
+                    summary TEXT CHECK(length(summary) <= {config.SUMMARY_MAX_WORDS * 5}),
+                    message_count INTEGER NOT NULL DEFAULT 0
                 ) STRICT;
                 """)
+                self._migrate_message_count(conn)
 
                 # Messages table with timestamp default
                 conn.execute(f"""
                 CREATE TABLE IF NOT EXISTS messages (
                     id INTEGER PRIMARY KEY,
                     session_id TEXT NOT NULL CHECK(length(session_id) = 36),
-                    role TEXT CHECK(role IN ({','.join(f"'{r}'" for r in config.VALID_ROLES)})),
+                    role TEXT CHECK(role IN ({','.join(f"'{r}'" for r in sorted(config.VALID_ROLES))})),
                     content TEXT NOT NULL CHECK(length(content) <= {config.MAX_MESSAGE_LENGTH}),
                     timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY(session_id) REFERENCES sessions(id) ON DELETE CASCADE
                 ) STRICT;
                 """)
+
+                # Newest-first per-session reads walk this index instead of sorting
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_messages_session_id ON messages(session_id, id DESC)"
+                )
+                # Only ephemeral sessions are eviction candidates; keep the index to those
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions(last_active) WHERE persistent = 0"
+                )
                 logging.debug("Database schema verified/created")
                 
             except sqlite3.Error as e:
                 logging.error(f"Database initialization failed: {str(e)}")
                 raise
 
+    @staticmethod
+    def _migrate_message_count(conn: sqlite3.Connection) -> None:
+        """Add and backfill sessions.message_count on databases created before it existed."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+        if "message_count" in columns:
+            return
+        conn.execute("ALTER TABLE sessions ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0")
+        conn.execute(
+            """UPDATE sessions SET message_count =
+            (SELECT COUNT(*) FROM messages WHERE messages.session_id = sessions.id)"""
+        )
+        logging.info("Migrated sessions table: added message_count")
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a connection and apply the per-connection performance pragmas once."""
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+        conn.execute(f"PRAGMA synchronous={config.SQLITE_SYNC_MODE}")
+        conn.execute(f"PRAGMA temp_store={config.SQLITE_TEMP_STORE}")
+        conn.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size={config.SQLITE_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA journal_size_limit={config.SQLITE_JOURNAL_SIZE_LIMIT}")
+        conn.execute(f"PRAGMA wal_autocheckpoint={config.SQLITE_WAL_AUTOCHECKPOINT}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
     @contextmanager
     def _get_connection(self) -> Iterator[sqlite3.Connection]:
-        """Thread-safe connection pool with health checks."""
-        conn = None
+        """Per-thread connection, leased lazily; local SQLite handles don't go stale."""
+        lease = getattr(self._tls, "lease", None)
+        if lease is None:
+            lease = self._lease()
         try:
-            with self.pool_lock:
-                if self.connection_pool:
-                    conn = self.connection_pool.pop()
-                    try:
-                        conn.execute("SELECT 1")
-                        logging.debug("Reused connection from pool")
-                    except sqlite3.Error:
-                        conn.close()
-                        conn = sqlite3.connect(self.db_path, isolation_level=None)
-                        logging.debug("Created new connection (pooled was stale)")
-                else:
-                    conn = sqlite3.connect(self.db_path, isolation_level=None)
-                    logging.debug("Created new connection (pool empty)")
-                conn.execute("PRAGMA foreign_keys=ON")
-            yield conn
-        except Exception as e:
-            logging.error(f"Connection acquisition failed: {str(e)}")
-            if conn:
-                conn.close()
+            yield lease.conn
+        except sqlite3.ProgrammingError as e:
+            # Handle was closed under us (e.g. close_all); lease a fresh one on next use
+            logging.error(f"Connection unusable, discarding: {str(e)}")
+            self._forget(lease.conn)
+            self._tls.lease = None
             raise
-        finally:
-            if conn:
-                with self.pool_lock:
-                    self.connection_pool.append(conn)
-                    logging.debug("Returned connection to pool")
+
+    def _lease(self) -> _Lease:
+        """Bind an idle (or new) connection to the calling thread until it exits."""
+        try:
+            conn = self._idle.get_nowait()
+            logging.debug("Reused idle connection for thread %d", threading.get_ident())
+        except Empty:
+            conn = self._open_connection()
+            with self._connections_lock:
+                self._connections.add(conn)
+            logging.debug("Opened connection for thread %d", threading.get_ident())
+
+        lease = _Lease(conn)
+        weakref.finalize(lease, self._release, conn).atexit = False
+        self._tls.lease = lease
+        return lease
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        """Thread exited: park its connection for the next thread, or close it if enough are idle."""
+        if conn not in self._connections:  # Already closed by close_all or discarded
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except Full:
+            self._forget(conn)
+            conn.close()
+            logging.debug("Closed surplus idle connection")
+
+    def _forget(self, conn: sqlite3.Connection) -> None:
+        """Drop a connection from the close_all registry."""
+        with self._connections_lock:
+            self._connections.discard(conn)
 
     @contextmanager
     def transaction(self) -> Iterator[sqlite3.Connection]:
-        """Atomic transaction with rollback protection."""
+        """Atomic transaction with rollback protection, for multi-statement writes only.
+
+        Connections run with isolation_level=None, so a lone statement already
+        commits on its own; wrapping it here would just add BEGIN/COMMIT.
+        """
         with self._get_connection() as conn:
             conn.execute("BEGIN IMMEDIATE")
             try:
@@ -104,54 +193,84 @@ class ChatDatabase:
 
     # === Session Management ===
     def create_session(self, session_id: str, persistent: bool) -> None:
-        """Create session with timestamp auto-generation."""
-        with self.transaction() as conn:
+        """Create session with timestamp auto-generation (single statement, autocommits)."""
+        with self._get_connection() as conn:
             conn.execute(
-                "INSERT INTO sessions (id, persistent) VALUES (?, ?)",
+                SQL_INSERT_SESSION,
                 (session_id, persistent)
             )
-            logging.debug(f"Created {'persistent' if persistent else 'ephemeral'} session: {session_id}")
+            self._persistent_cache[session_id] = bool(persistent)
+            logging.debug("Created %s session: %s", "persistent" if persistent else "ephemeral", session_id)
 
     def is_persistent(self, session_id: str) -> bool:
-        """Check session persistence status."""
+        """Check session persistence status (cached once the session row exists)."""
+        cached = self._persistent_cache.get(session_id)
+        if cached is not None:
+            return cached
+
         with self._get_connection() as conn:
             result = conn.execute(
-                "SELECT persistent FROM sessions WHERE id = ?",
+                SQL_SELECT_PERSISTENT,
                 (session_id,)
             ).fetchone()
             is_persistent = bool(result[0]) if result else False
-            logging.debug(f"Session {session_id} persistence: {is_persistent}")
+            if result:  # A missing row may still be created by add_messages, so don't cache it
+                self._persistent_cache[session_id] = is_persistent
+            logging.debug("Session %s persistence: %s", session_id, is_persistent)
             return is_persistent
 
+    def persistent_session_ids(self) -> Set[str]:
+        """All persistent session ids, for seeding an in-memory validity index."""
+        with self._get_connection() as conn:
+            ids = {row[0] for row in conn.execute(SQL_SELECT_PERSISTENT_IDS)}
+        self._persistent_cache.update(dict.fromkeys(ids, True))
+        return ids
+
     # === Message Handling ===
     def add_message(self, session_id: str, role: str, content: str) -> None:
         """Save message with automatic timestamp generation."""
+        self.add_messages(session_id, [(role, content)])
+
+    def add_messages(self, session_id: str, items: List[Tuple[str, str]]) -> int:
+        """Save (role, content) pairs for one session in a single transaction.
+
+        Returns the session's message count after the insert.
+        """
         with self.transaction() as conn:
             # Ensure session exists (timestamp auto-generated by DB)
-            conn.execute(
-                "INSERT OR IGNORE INTO sessions (id, persistent) VALUES (?, ?)",
+            created = conn.execute(
+                SQL_ENSURE_SESSION,
                 (session_id, config.PERSISTENT_SESSIONS_DEFAULT)
-            )
+            ).rowcount
+            if created:
+                self._persistent_cache[session_id] = config.PERSISTENT_SESSIONS_DEFAULT
             
-            # Save message (timestamp handled by DEFAULT CURRENT_TIMESTAMP)
-            conn.execute(
-                """INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)""",
-                (session_id, role, content)
+            # Save messages (timestamp handled by DEFAULT CURRENT_TIMESTAMP)
+            conn.executemany(
+                SQL_INSERT_MESSAGE,
+                [(session_id, role, content) for role, content in items]
             )
             
-            # Update activity timestamp
-            conn.execute(
-                "UPDATE sessions SET last_active = CURRENT_TIMESTAMP WHERE id = ?",
-                (session_id,)
-            )
-            logging.debug(f"Added {role} message to {session_id[:8]} (chars: {len(content)})")
+            # Update activity timestamp + counter, reading the new count back
+            count = conn.execute(
+                SQL_BUMP_SESSION,
+                (len(items), session_id)
+            ).fetchone()[0]
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug("Added %d message(s) to %.8s (roles: %s)", len(items), session_id, [r for r, _ in items])
+
+        # Committed: extend a warm context tail (cold sessions are seeded on first read)
+        with self._context_lock:
+            cached = self._context_cache.get(session_id)
+            if cached is not None:
+                cached.extend({"role": role, "content": content} for role, content in items)
+        return count
 
     def get_messages(self, session_id: str, limit: int = config.MAX_CONTEXT_LENGTH) -> List[Message]:
         """Retrieve messages with safe timestamp handling."""
         with self._get_connection() as conn:
             rows = conn.execute(
-                """SELECT role, content, timestamp FROM messages 
-                WHERE session_id = ? ORDER BY timestamp DESC LIMIT ?""",
+                SQL_SELECT_MESSAGES,
                 (session_id, limit)
             ).fetchall()
 
@@ -159,34 +278,54 @@ class ChatDatabase:
                 return []
 
             messages = []
-            for row in rows:
+            for role, content, raw_ts in reversed(rows):  # Chronological order
                 try:
                     # Convert timestamp only if present
-                    ts = datetime.fromisoformat(row[2]) if row[2] else None
-                    messages.append(Message(
-                        role=row[0],
-                        content=row[1],
-                        timestamp=ts
-                    ))
-                except Exception as e:
-                    logging.warning(f"Invalid timestamp format in message {row[0]}: {str(e)}")
-                    messages.append(Message(
-                        role=row[0],
-                        content=row[1],
-                        timestamp=None
-                    ))
+                    ts = datetime.fromisoformat(raw_ts) if raw_ts else None
+                except ValueError as e:
+                    logging.warning(f"Invalid timestamp format in message {role}: {str(e)}")
+                    ts = None
+                messages.append(Message(role, content, ts))
             
-            logging.debug(f"Retrieved {len(messages)} messages for {session_id[:8]}")
-            return list(reversed(messages))  # Return chronological order
+            logging.debug("Retrieved %d messages for %.8s", len(messages), session_id)
+            return messages
+
+    def get_messages_as_dicts(self, session_id: str, limit: int = config.MAX_CONTEXT_LENGTH) -> List[Dict[str, str]]:
+        """Retrieve chronological {"role", "content"} dicts from the in-memory tail,
+        falling back to one query (which also seeds the tail) on a miss."""
+        cacheable = limit <= config.MAX_CONTEXT_LENGTH
+        if cacheable:
+            with self._context_lock:
+                cached = self._context_cache.get(session_id)
+                if cached is not None:
+                    self._context_cache.move_to_end(session_id)
+                    return list(cached)[-limit:] if limit else []
+
+        with self._get_connection() as conn:
+            rows = conn.execute(
+                SQL_SELECT_CONTEXT,
+                (session_id, config.MAX_CONTEXT_LENGTH if cacheable else limit)
+            ).fetchall()
+        messages = [{"role": role, "content": content} for role, content in reversed(rows)]
+        logging.debug("Retrieved %d context messages for %.8s", len(messages), session_id)
+
+        if not cacheable:
+            return messages
+        with self._context_lock:
+            self._context_cache[session_id] = deque(messages, maxlen=config.MAX_CONTEXT_LENGTH)
+            if len(self._context_cache) > config.CONTEXT_CACHE_SESSIONS:
+                self._context_cache.popitem(last=False)
+        return messages[-limit:] if limit else []
 
     def get_message_count(self, session_id: str) -> int:
-        """Count messages ignoring timestamp validity."""
+        """Read the session's maintained message counter (primary-key lookup, no scan)."""
         with self._get_connection() as conn:
-            count = conn.execute(
-                "SELECT COUNT(*) FROM messages WHERE session_id = ?",
+            result = conn.execute(
+                SQL_SELECT_MESSAGE_COUNT,
                 (session_id,)
-            ).fetchone()[0]
-            logging.debug(f"Message count for {session_id[:8]}: {count}")
+            ).fetchone()
+            count = result[0] if result else 0
+            logging.debug("Message count for %.8s: %d", session_id, count)
             return count
 
     # === Summarization ===
@@ -196,11 +335,9 @@ class ChatDatabase:
             logging.warning(f"Summary too long ({len(summary)} chars), truncating")
             summary = summary[:config.SUMMARY_MAX_WORDS * 5]
             
-        with self.transaction() as conn:
+        with self._get_connection() as conn:  # Single UPDATE: autocommit, no BEGIN/COMMIT pair
             conn.execute(
-                """UPDATE sessions 
-                SET summary = ?, last_active = CURRENT_TIMESTAMP 
-                WHERE id = ?""",
+                SQL_SAVE_SUMMARY,
                 (summary, session_id)
             )
             logging.info(f"Saved summary for {session_id[:8]} ({len(summary)} chars)")
@@ -209,23 +346,45 @@ class ChatDatabase:
         """Retrieve summary if exists."""
         with self._get_connection() as conn:
             result = conn.execute(
-                "SELECT summary FROM sessions WHERE id = ?",
+                SQL_SELECT_SUMMARY,
                 (session_id,)
             ).fetchone()
             if result:
-                logging.debug(f"Retrieved summary for {session_id[:8]}")
+                logging.debug("Retrieved summary for %.8s", session_id)
                 return result[0]
-            logging.debug(f"No summary found for {session_id[:8]}")
+            logging.debug("No summary found for %.8s", session_id)
             return None
 
+    # === Maintenance ===
+    def checkpoint(self) -> None:
+        """Fold the WAL back into the database and truncate it (run off the request path)."""
+        with self._get_connection() as conn:
+            busy, wal_pages, moved = conn.execute(SQL_WAL_CHECKPOINT).fetchone()
+            if busy:
+                logging.debug("WAL checkpoint blocked by an active reader/writer; retrying next interval")
+            else:
+                logging.debug("WAL checkpoint | %d/%d pages moved", moved, wal_pages)
+
     def close_all(self) -> None:
         """Cleanup connections with error handling."""
-        with self.pool_lock:
-            for conn in self.connection_pool:
-                try:
-                    conn.close()
-                    logging.debug("Closed database connection")
-                except sqlite3.Error:
-                    pass
-            self.connection_pool.clear()
-            logging.info("All database connections closed")
\ No newline at end of file
+        # Detach the registry under the lock, then optimize/close outside it: a lease
+        # finalizer firing during gc on this thread would otherwise block on the lock
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.execute("PRAGMA optimize")  # Refresh planner stats, as SQLite recommends at close
+            except sqlite3.Error as e:
+                logging.debug("PRAGMA optimize skipped: %s", e)
+            try:
+                conn.close()
+                logging.debug("Closed database connection")
+            except sqlite3.Error:
+                pass
+        self._tls = threading.local()
+        self._idle = LifoQueue(maxsize=config.CONNECTION_POOL_SIZE)
+        self._persistent_cache.clear()
+        with self._context_lock:
+            self._context_cache.clear()
+        logging.info("All database connections closed")
\ No newline at end of file
@@ -1,4 +1,6 @@
 import logging
+import re
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Literal
 from pydantic import BaseModel, Field, validator, ValidationError
@@ -6,6 +8,9 @@ from config import config
 
 logger = logging.getLogger(__name__)
 
+# Same alphabet as the old per-char check (case-insensitive hex + dashes); length is enforced by the Field
+_SESSION_ID_RE = re.compile(r"[0-9a-fA-F-]+")
+
 class ChatRequest(BaseModel):
     """
     Validated chat request payload with enhanced debug logging.
@@ -29,7 +34,7 @@ class ChatRequest(BaseModel):
 
     @validator('session_id')
     def validate_session_id(cls, v):
-        if v and not all(c in '0123456789abcdef-' for c in v.lower()):
+        if v and not _SESSION_ID_RE.fullmatch(v):
             logger.warning(f"Invalid session ID format: {v}")
             raise ValueError("Invalid session ID format")
         return v
@@ -67,27 +72,16 @@ class ChatResponse(BaseModel):
             f"Response length: {len(self.response)} chars"
         )
 
-class Message(BaseModel):
+@dataclass(frozen=True, slots=True)
+class Message:
     """
-    Validated chat message with role enforcement.
+    Chat message row; a plain slotted dataclass so building one per DB row skips
+    the validator stack. Role/length are enforced by the schema's CHECK constraints,
+    and pydantic still checks the annotations wherever it is nested in a model.
     """
-    role: Literal[*config.VALID_ROLES] = Field(
-        ...,
-        description=f"Must be one of: {', '.join(config.VALID_ROLES)}"
-    )
-    content: str = Field(
-        ...,
-        min_length=1,
-        max_length=config.MAX_MESSAGE_LENGTH,
-        description=f"Message text (1-{config.MAX_MESSAGE_LENGTH} chars)"
-    )
-    timestamp: Optional[datetime] = Field(default=None)
-
-    @classmethod
-    def validate_role(cls, v):
-        if v not in config.VALID_ROLES:
-            logger.error(f"Invalid role: {v} | Allowed: {config.VALID_ROLES}")
-        return v
+    role: Literal[*sorted(config.VALID_ROLES)]
+    content: str
+    timestamp: Optional[datetime] = None
 
 class MessageHistory(BaseModel):
     """
@@ -1,6 +1,6 @@
 import logging
-from typing import AsyncGenerator, Dict, List, Optional
-from datetime import datetime
+import time
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
 
 from .models import ChatRequest, ChatResponse
 from .database import ChatDatabase
@@ -25,6 +25,8 @@ class ChatService:
         self.llm = llm
         self.summary_service = summary_service
         self.max_context_length = config.MAX_CONTEXT_LENGTH
+        # Built once and shared by every context; only ever read by the LLM serializer
+        self._system_msg = {"role": "system", "content": config.SYSTEM_PROMPT_RENDERED}
         logging.info(
             f"ChatService initialized | Max context: {self.max_context_length} messages | "
             f"Summary trigger: every {config.SUMMARY_TRIGGER} messages"
@@ -41,22 +43,19 @@ class ChatService:
                 request.session_id,
                 persistent=getattr(request, 'persistent', None)
             )
-            logging.debug(f"Processing message for session {session_id[:8]}...")
+            logging.debug("Processing message for session %.8s...", session_id)
 
-            # Save user message
-            self._save_message(session_id, "user", request.message)
-            logging.debug(f"Saved user message ({len(request.message)} chars)")
-
-            # Generate response
-            context = self._get_context(session_id)
+            # Generate response (user message is held back until the reply exists)
+            user_message = {"role": "user", "content": request.message}
+            context = self._get_context(session_id, pending=user_message)
             response = await self._generate_response(context)
-            logging.debug(f"Generated LLM response ({len(response)} chars)")
+            logging.debug("Generated LLM response (%d chars)", len(response))
 
-            # Save AI response
-            self._save_message(session_id, "assistant", response)
+            # Save user message + AI response in one transaction
+            message_count = self._save_messages(session_id, [("user", request.message), ("assistant", response)])
             
             # Conditional summarization
-            await self._maybe_summarize(session_id)
+            await self._maybe_summarize(session_id, message_count)
 
             return ChatResponse(
                 response=response,
@@ -72,77 +71,82 @@ class ChatService:
             raise
 
     async def stream_response(self, request: ChatRequest) -> AsyncGenerator[str, None]:
-        """Stream LLM response with session persistence support."""
+        """Stream LLM response with session persistence support.
+
+        The user turn is written together with the reply once the stream ends;
+        if the stream is cancelled or fails first, it is saved on its own so
+        the turn is never lost.
+        """
+        session_id = None
+        saved = False
         try:
             session_id = self.sessions.get_or_create(
                 request.session_id,
                 persistent=getattr(request, 'persistent', None)
             )
-            logging.debug(f"Streaming response for session {session_id[:8]}")
+            logging.debug("Streaming response for session %.8s", session_id)
 
-            self._save_message(session_id, "user", request.message)
-            
-            full_response = ""
+            user_message = {"role": "user", "content": request.message}
+            chunks: List[str] = []
             async for chunk in self.llm.generate_response(
-                self._get_context(session_id),
+                self._get_context(session_id, pending=user_message),
                 stream=True
             ):
-                full_response += chunk
+                chunks.append(chunk)
                 yield chunk
 
-            self._save_message(session_id, "assistant", full_response)
-            await self._maybe_summarize(session_id)
-            logging.debug(f"Completed streaming ({len(full_response)} chars)")
+            full_response = "".join(chunks)  # One O(n) join instead of repeated str +=
+            message_count = self._save_messages(session_id, [("user", request.message), ("assistant", full_response)])
+            saved = True
+            await self._maybe_summarize(session_id, message_count)
+            logging.debug("Completed streaming (%d chars)", len(full_response))
 
         except Exception as e:
-            logging.error(f"Stream failed for session {session_id[:8]}: {str(e)}")
+            logging.error(f"Stream failed for session {session_id[:8] if session_id else 'N/A'}: {str(e)}")
             yield "⚠️ Error: Please try again"
             raise
+        finally:
+            # Cancelled (client disconnect) or failed before the turn was written
+            if session_id and not saved:
+                try:
+                    self._save_messages(session_id, [("user", request.message)])
+                except Exception:
+                    pass  # Already logged by _save_messages
 
     # ====================== PRIVATE METHODS ======================
-    def _get_context(self, session_id: str) -> List[Dict[str, str]]:
+    def _get_context(
+        self,
+        session_id: str,
+        pending: Optional[Dict[str, str]] = None
+    ) -> List[Dict[str, str]]:
         """
         Retrieve conversation context with:
         - System prompt injection (timestamp-free)
-        - Message validation
+        - Optional not-yet-saved message appended last
         - Debug logging
         """
         try:
-            # 1. Fetch messages from DB (preserves original functionality)
-            db_messages = self.db.get_messages(session_id, self.max_context_length) or []
+            # 1. Fetch messages from DB, leaving room for the pending one
+            limit = self.max_context_length - 1 if pending else self.max_context_length
+            # 2. Already in OpenAI dict format (no Message models / timestamps)
+            messages = self.db.get_messages_as_dicts(session_id, limit)
+            if pending:
+                messages.append(pending)
             
-            # 2. Convert to dict format (exclude None timestamps)
-            messages = [
-                {
-                    "role": msg.role,
-                    "content": msg.content,
-                    **({"timestamp": msg.timestamp.isoformat()} if msg.timestamp else {})
-                }
-                for msg in db_messages
-            ]
+            # 3. Inject system prompt if missing (timestamp not required).
+            # Only user/assistant turns are ever persisted, so a stored system
+            # prompt can only be the oldest row - no need to scan the context.
+            if not messages or messages[0]["role"] != "system":
+                messages.insert(0, self._system_msg)
             
-            # 3. Inject system prompt if missing (timestamp not required)
-            if not any(msg.get("role") == "system" for msg in messages):
-                system_prompt = {
-                    "role": "system",
-                    "content": config.PROMPTS["system"].format(
-                        model_name=config.MODELS["default"]
-                    )
-                    # Explicitly no timestamp
-                }
-                messages.insert(0, system_prompt)
+            # 4. Log context composition
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
                 logging.debug(
-                    f"Injected system prompt into {session_id[:8]} | "
-                    f"Model: {config.MODELS['default']}"
+                    "Context prepared for %.8s | Messages: %d/%d | Roles: %s",
+                    session_id, len(messages), self.max_context_length,
+                    set(m['role'] for m in messages)
                 )
             
-            # 4. Log context composition
-            logging.debug(
-                f"Context prepared for {session_id[:8]} | "
-                f"Messages: {len(messages)}/{self.max_context_length} | "
-                f"Roles: {set(m['role'] for m in messages)}"
-            )
-            
             return messages
 
         except Exception as e:
@@ -156,48 +160,62 @@ class ChatService:
     async def _generate_response(self, context: List[Dict]) -> str:
         """Generate LLM response with error handling and timing."""
         try:
-            start_time = datetime.now()
+            timed = logging.getLogger().isEnabledFor(logging.DEBUG)
+            start_time = time.perf_counter() if timed else 0.0
             async for response in self.llm.generate_response(context):
-                elapsed = (datetime.now() - start_time).total_seconds()
-                logging.debug(f"LLM response generated in {elapsed:.2f}s")
+                if timed:
+                    logging.debug("LLM response generated in %.2fs", time.perf_counter() - start_time)
                 return response
         except Exception as e:
             logging.error(f"LLM generation failed: {str(e)}")
             return "⚠️ I encountered an error processing your request."
 
-    def _save_message(self, session_id: str, role: str, content: str):
-        """Save message with validation and debug logging."""
+    def _save_messages(self, session_id: str, items: List[Tuple[str, str]]) -> int:
+        """Save a turn's (role, content) pairs in one transaction; returns the new message count."""
         try:
             if not session_id:
-                logging.warning("Attempted to save message without session_id")
-                return
-
-            self.db.add_message(session_id, role, content)
-            logging.debug(f"Saved {role} message to {session_id[:8]} ({len(content)} chars)")
+                logging.warning("Attempted to save messages without session_id")
+                return 0
+
+            # Replies can outgrow the messages.content CHECK (LLM_MAX_TOKENS > MAX_MESSAGE_LENGTH
+            # chars); truncate rather than let the constraint roll back the user's turn too
+            limit = config.MAX_MESSAGE_LENGTH
+            if any(len(content) > limit for _, content in items):
+                logging.warning("Truncating message(s) for %.8s to %d chars", session_id, limit)
+                items = [(role, content[:limit]) for role, content in items]
+
+            message_count = self.db.add_messages(session_id, items)
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(
+                    "Saved %d message(s) to %.8s (%d chars)",
+                    len(items), session_id, sum(len(content) for _, content in items)
+                )
+            return message_count
         except Exception as e:
             logging.error(f"Message save failed: {str(e)}")
             raise
 
-    async def _maybe_summarize(self, session_id: str):
+    async def _maybe_summarize(self, session_id: str, message_count: int):
         """Conditionally trigger summarization with detailed logging."""
         try:
-            if not self.sessions.is_persistent(session_id):
-                logging.debug(f"Skipping summarization for ephemeral session {session_id[:8]}")
+            if not message_count or message_count % config.SUMMARY_TRIGGER:
                 return
 
-            message_count = self.db.get_message_count(session_id)
-            if message_count % config.SUMMARY_TRIGGER == 0:
-                logging.info(
-                    f"Triggering summarization for {session_id[:8]} "
-                    f"(message count: {message_count})"
-                )
-                messages = self._get_context(session_id)
-                summary = await self.summary_service.generate_summary(messages)
+            if not self.db.is_persistent(session_id):
+                logging.debug("Skipping summarization for ephemeral session %.8s", session_id)
+                return
+
+            logging.info(
+                f"Triggering summarization for {session_id[:8]} "
+                f"(message count: {message_count})"
+            )
+            messages = self._get_context(session_id)
+            summary = await self.summary_service.generate_summary(messages)
                 
-                if summary and not summary.startswith("⚠️"):
-                    self.db.save_summary(session_id, summary)
-                    logging.info(f"Saved summary for {session_id[:8]} ({len(summary)} chars)")
-                else:
-                    logging.warning(f"Summary generation failed for {session_id[:8]}")
+            if summary and not summary.startswith("⚠️"):
+                self.db.save_summary(session_id, summary)
+                logging.info(f"Saved summary for {session_id[:8]} ({len(summary)} chars)")
+            else:
+                logging.warning(f"Summary generation failed for {session_id[:8]}")
         except Exception as e:
             logging.error(f"Summarization failed: {str(e)}", exc_info=config.DEBUG)
@@ -1,22 +1,59 @@
+import os
+import time
 import uuid
+import asyncio
+import threading
+import shutil
 import logging
+import calendar
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
-import json
+from typing import Optional, Dict, Any, Iterator, List, Set, Tuple
+import orjson
 from datetime import datetime, timedelta
 
 from config import config
 from .database import ChatDatabase
 
+_DAY_SECONDS = 86400
+_CLEANUP_BATCH_SIZE = 256   # Unlinks handed to the pool per batch
+_CLEANUP_MAX_WORKERS = 8
+_EXPIRY_SWEEP_MIN = 1024    # Ephemeral index size that triggers the first expiry sweep
+
 class SessionManager:
     """Manages chat sessions with persistence control and debug logging."""
 
-    def __init__(self, session_dir: str, ttl_days: int = config.SESSION_TTL_DAYS):
+    def __init__(
+        self,
+        session_dir: str,
+        ttl_days: int = config.SESSION_TTL_DAYS,
+        db: Optional[ChatDatabase] = None
+    ):
         self.session_dir = Path(session_dir)
         self.ttl = timedelta(days=ttl_days)
+        self._ttl_seconds = self.ttl.total_seconds()  # Compared against float unix timestamps
+        # One handle (and its per-thread connection pool) for every session lookup
+        self.db = db if db is not None else ChatDatabase(config.DATABASE_PATH)
+        # Known-good sessions: persistent ids (seeded from the DB) and ephemeral id -> unix expiry
+        self._persistent_ids: Set[str] = self._seed_persistent_ids()
+        self._ephemeral_expiry: Dict[str, float] = {}
+        self._expiry_sweep_at = _EXPIRY_SWEEP_MIN
+        # Ephemeral metadata waiting for the next batched flush (id -> (path, encoded JSON))
+        self._pending_writes: Dict[str, Tuple[Path, bytes]] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One flush at a time: concurrent ones share `.json.tmp` paths
+        self._flush_task: Optional[asyncio.Task] = None
         self._init_session_storage()
         logging.debug(f"Session manager initialized | Directory: {self.session_dir} | TTL: {ttl_days} days")
 
+    def _seed_persistent_ids(self) -> Set[str]:
+        """One `SELECT id ... WHERE persistent = 1` at startup; an empty index just means more misses."""
+        try:
+            return self.db.persistent_session_ids()
+        except Exception as e:
+            logging.error(f"Failed to load persistent session ids: {str(e)}")
+            return set()
+
     def _init_session_storage(self) -> None:
         """Ensure session directory exists with debug logging."""
         try:
@@ -26,36 +63,117 @@ class SessionManager:
             logging.error(f"Failed to initialize session storage: {str(e)}")
             raise
 
+    def _bucket_path(self, session_id: str, written_at: float) -> Path:
+        """Metadata file location for a write at `written_at`: `YYYY/MM/DD/<id>.json` (UTC day)."""
+        return self.session_dir / time.strftime("%Y/%m/%d", time.gmtime(written_at)) / f"{session_id}.json"
+
+    def _candidate_paths(self, session_id: str) -> Iterator[Path]:
+        """Where an unexpired session's metadata can be: newest day bucket first, then the flat root.
+
+        Files are written once, at creation, so only the buckets inside the TTL window
+        need probing; the flat root holds sessions created before bucketing.
+        """
+        now = time.time()
+        for day in range(int(now // _DAY_SECONDS), int((now - self._ttl_seconds) // _DAY_SECONDS) - 1, -1):
+            yield self._bucket_path(session_id, day * _DAY_SECONDS)
+        yield self.session_dir / f"{session_id}.json"
+
+    @staticmethod
+    def _write_atomic(session_file: Path, payload: bytes) -> None:
+        """Write via a sibling temp file + os.replace so readers never see a partial file.
+
+        The `.json.tmp` suffix keeps half-written files out of cleanup's `*.json` scan.
+        """
+        session_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = session_file.with_suffix(".json.tmp")
+        tmp.write_bytes(payload)
+        os.replace(tmp, session_file)
+
     def _save_to_disk(self, session_id: str, data: Dict[str, Any]) -> None:
         """Save session metadata to disk with error handling."""
-        session_file = self.session_dir / f"{session_id}.json"
+        session_file = self._bucket_path(session_id, time.time())
         try:
-            with open(session_file, 'w') as f:
-                json.dump(data, f)
+            self._write_atomic(session_file, orjson.dumps(data))
             logging.debug(f"Saved session metadata to {session_file}")
-        except (IOError, json.JSONEncodeError) as e:
+        except (OSError, TypeError, ValueError) as e:
             logging.error(f"Failed to save session {session_id}: {str(e)}")
             raise
 
+    def _queue_to_disk(self, session_id: str, data: Dict[str, Any]) -> None:
+        """Buffer ephemeral metadata and let one background flush write the whole batch.
+
+        Outside a running event loop (scripts, worker threads) this falls back to a
+        direct `_save_to_disk`.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._save_to_disk(session_id, data)
+            return
+
+        with self._pending_lock:
+            self._pending_writes[session_id] = (self._bucket_path(session_id, time.time()), orjson.dumps(data))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(asyncio.to_thread(self.flush_pending))
+
+    def flush_pending(self) -> int:
+        """Write every buffered metadata file; returns how many were written.
+
+        Entries stay visible to `_load_from_disk` until their file exists, and
+        anything queued while a batch is being written is picked up by the next pass.
+        A call made while another flush is running (e.g. at shutdown) waits for it.
+        """
+        with self._flush_lock:
+            written = 0
+            while True:
+                with self._pending_lock:
+                    batch = list(self._pending_writes.items())
+                if not batch:
+                    break
+                for session_id, (session_file, payload) in batch:
+                    try:
+                        self._write_atomic(session_file, payload)
+                        written += 1
+                    except OSError as e:
+                        logging.error(f"Failed to save session {session_id}: {str(e)}")
+                with self._pending_lock:
+                    for session_id, entry in batch:
+                        if self._pending_writes.get(session_id) is entry:
+                            del self._pending_writes[session_id]
+            if written:
+                logging.debug("Flushed %d buffered session metadata files", written)
+            return written
+
     def _load_from_disk(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Load session metadata with validation."""
-        session_file = self.session_dir / f"{session_id}.json"
-        if not session_file.exists():
-            return None
+        pending = self._pending_writes.get(session_id)  # Created but not flushed yet
+        if pending is not None:
+            session_file, raw = pending
+        else:
+            for session_file in self._candidate_paths(session_id):
+                try:
+                    raw = session_file.read_bytes()  # No text-mode file object / codec layer
+                    break
+                except FileNotFoundError:
+                    continue
+            else:
+                return None
 
         try:
-            with open(session_file, 'r') as f:
-                data = json.load(f)
+            data = orjson.loads(raw)
             
             # Validate TTL
-            last_active = datetime.fromisoformat(data['last_active'])
-            if datetime.now() - last_active > self.ttl:
+            last_active = data['last_active']
+            if isinstance(last_active, str):  # Files written before timestamps were floats
+                last_active = datetime.fromisoformat(last_active).timestamp()
+            if time.time() - last_active > self._ttl_seconds:
                 logging.debug(f"Session {session_id} expired (last active: {last_active})")
                 return None
-                
+
+            data['last_active'] = last_active  # Normalised to a unix float for callers
             logging.debug(f"Loaded valid session {session_id}")
             return data
-        except Exception as e:
+        except (OSError, ValueError, KeyError, TypeError) as e:
             logging.warning(f"Corrupted session file {session_file}: {str(e)}")
             return None
 
@@ -65,22 +183,25 @@ class SessionManager:
             persistent = config.PERSISTENT_SESSIONS_DEFAULT
         
         session_id = str(uuid.uuid4())
+        now = time.time()
         metadata = {
             'id': session_id,
             'persistent': persistent,
-            'created_at': datetime.now().isoformat(),
-            'last_active': datetime.now().isoformat()
+            'created_at': now,
+            'last_active': now
         }
 
         if persistent:
             try:
-                ChatDatabase(config.DATABASE_PATH).create_session(session_id, persistent)
+                self.db.create_session(session_id, persistent)
+                self._persistent_ids.add(session_id)
                 logging.info(f"Created persistent session {session_id}")
             except Exception as e:
                 logging.error(f"Failed to create DB session: {str(e)}")
                 raise
         else:
-            self._save_to_disk(session_id, metadata)
+            self._queue_to_disk(session_id, metadata)
+            self._index_ephemeral(session_id, now + self._ttl_seconds)
             logging.info(f"Created ephemeral session {session_id}")
 
         return session_id
@@ -99,48 +220,147 @@ class SessionManager:
         return self.create_session(persistent)
 
     def validate_session(self, session_id: str) -> bool:
-        """Check session validity with detailed state logging."""
+        """Check session validity with detailed state logging.
+
+        Known sessions are answered from the in-memory index; disk and DB are only
+        consulted on a miss. Misses are not cached: another worker may have just
+        created the session and not flushed its metadata yet.
+        """
+        if session_id in self._persistent_ids:
+            return True
+        expires_at = self._ephemeral_expiry.get(session_id)
+        if expires_at is not None:
+            if time.time() < expires_at:
+                return True
+            self._ephemeral_expiry.pop(session_id, None)
+
         # Check disk first (ephemeral sessions)
         disk_data = self._load_from_disk(session_id)
         if disk_data:
             logging.debug(f"Valid ephemeral session: {session_id}")
+            self._index_ephemeral(session_id, disk_data['last_active'] + self._ttl_seconds)
             return True
 
         # Check database (persistent sessions)
         try:
-            db = ChatDatabase(config.DATABASE_PATH)
-            if db.is_persistent(session_id):
+            if self.db.is_persistent(session_id):
                 logging.debug(f"Valid persistent session: {session_id}")
+                self._persistent_ids.add(session_id)
                 return True
         except Exception as e:
             logging.error(f"Session validation failed for {session_id}: {str(e)}")
+            return False  # Don't cache a lookup that errored
 
         logging.debug(f"Invalid session: {session_id}")
         return False
 
+    def _index_ephemeral(self, session_id: str, expires_at: float) -> None:
+        """Record an ephemeral session's expiry, sweeping expired entries as the index grows.
+
+        The sweep threshold doubles with the surviving entries, so the index stays
+        proportional to the live sessions at amortized O(1) per insert.
+        """
+        self._ephemeral_expiry[session_id] = expires_at
+        if len(self._ephemeral_expiry) >= self._expiry_sweep_at:
+            self._prune_ephemeral(time.time())
+            self._expiry_sweep_at = max(_EXPIRY_SWEEP_MIN, 2 * len(self._ephemeral_expiry))
+
+    def _prune_ephemeral(self, now: float) -> None:
+        """Drop expired ephemeral index entries."""
+        for session_id, expires_at in list(self._ephemeral_expiry.items()):  # Snapshot; may run off-loop
+            if expires_at <= now:
+                self._ephemeral_expiry.pop(session_id, None)
+
     def cleanup_expired(self) -> int:
-        """Remove expired sessions with logging."""
-        count = 0
-        for session_file in self.session_dir.glob("*.json"):
+        """Remove expired sessions with logging.
+
+        Day buckets that ended before the TTL cutoff are dropped whole; only the
+        boundary days (and legacy flat files) are inspected file by file. Metadata
+        files are written once, at creation, alongside `last_active`, so the file
+        mtime is used instead of opening and parsing each one. Expired paths are
+        collected first and then deleted in batches on a small thread pool.
+        """
+        now = time.time()
+        cutoff = now - self._ttl_seconds
+        self._prune_ephemeral(now)
+        expired_files = self._expired_in(self.session_dir, cutoff)  # Legacy flat layout
+        expired_buckets = []
+
+        for day_dir in self.session_dir.glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]"):
             try:
-                with open(session_file, 'r') as f:
-                    data = json.load(f)
-                
-                if datetime.now() - datetime.fromisoformat(data['last_active']) > self.ttl:
-                    session_file.unlink()
-                    count += 1
-                    logging.debug(f"Cleaned up expired session: {session_file.stem}")
-            except Exception as e:
-                logging.warning(f"Failed to clean up {session_file}: {str(e)}")
+                year, month, day = (int(part) for part in day_dir.relative_to(self.session_dir).parts)
+                day_start = calendar.timegm((year, month, day, 0, 0, 0))
+            except ValueError:
+                continue
+
+            if day_start + _DAY_SECONDS > cutoff:
+                expired_files.extend(self._expired_in(day_dir, cutoff))
+            else:
+                expired_buckets.append(day_dir)
+
+        if not expired_files and not expired_buckets:
+            logging.info("Session cleanup completed | Removed 0 expired sessions")
+            return 0
+
+        workers = min(_CLEANUP_MAX_WORKERS, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="session-cleanup") as pool:
+            count = sum(pool.map(self._remove_bucket, expired_buckets))
+            for i in range(0, len(expired_files), _CLEANUP_BATCH_SIZE):
+                count += sum(pool.map(self._remove_file, expired_files[i:i + _CLEANUP_BATCH_SIZE]))
 
         logging.info(f"Session cleanup completed | Removed {count} expired sessions")
         return count
 
+    @staticmethod
+    def _expired_in(directory: Path, cutoff: float) -> List[str]:
+        """Paths of `*.json` files in one directory whose mtime is before `cutoff`."""
+        expired = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        expired.append(entry.path)
+                except OSError as e:
+                    logging.warning(f"Failed to stat {entry.path}: {str(e)}")
+        return expired
+
+    @staticmethod
+    def _remove_file(path: str) -> int:
+        """Unlink one expired metadata file; returns 1 if it was removed."""
+        try:
+            os.unlink(path)
+            logging.debug(f"Cleaned up expired session: {os.path.basename(path)[:-5]}")
+            return 1
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            logging.warning(f"Failed to clean up {path}: {str(e)}")
+            return 0
+
+    @staticmethod
+    def _remove_bucket(day_dir: Path) -> int:
+        """Drop a fully expired day bucket (and empty month/year parents); returns files removed."""
+        try:
+            with os.scandir(day_dir) as entries:
+                count = sum(1 for entry in entries if entry.name.endswith(".json"))
+            shutil.rmtree(day_dir)
+            logging.debug(f"Cleaned up expired session bucket: {day_dir}")
+        except OSError as e:
+            logging.warning(f"Failed to clean up {day_dir}: {str(e)}")
+            return 0
+        for parent in (day_dir.parent, day_dir.parent.parent):  # Prune empty month/year dirs
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+        return count
+
     def is_persistent(self, session_id: str) -> bool:
         """Explicit persistence check with debug logging."""
         try:
-            db = ChatDatabase(config.DATABASE_PATH)
-            persistent = db.is_persistent(session_id)
+            persistent = self.db.is_persistent(session_id)
             logging.debug(f"Persistence check for {session_id}: {persistent}")
             return persistent
         except Exception as e:
@@ -17,6 +17,10 @@ class SummaryService:
             timeout=config.LLM_TIMEOUT  # Consistent with llm.py
         )
         self.model = config.MODELS["summarization"]
+        self._preamble = f"\n{config.PROMPTS['summarization']}\n\nConversation:\n"
+        thresholds = getattr(config, 'SUMMARY_QUALITY_THRESHOLDS', {})
+        self._min_length = thresholds.get('min_length', 100)
+        self._bullet_threshold = thresholds.get('bullet_points', 3)
         logger.info(
             f"SummaryService initialized | Model: {self.model} | "
             f"Max words: {config.SUMMARY_MAX_WORDS}"
@@ -67,42 +71,42 @@ class SummaryService:
             return "⚠️ Summary unavailable"
 
     def _build_prompt(self, messages: List[Dict]) -> str:
-        """Construct prompt with length validation."""
-        conversation = "\n".join(
-            f"{msg['role']}: {msg['content'][:config.MAX_MESSAGE_LENGTH]}"  # Truncate long messages
-            for msg in messages
-        )
-        prompt = f"""
-        {config.PROMPTS["summarization"]}
-        
-        Conversation:
-        {conversation}
+        """Construct prompt from the cached preamble.
+
+        Content is already capped at MAX_MESSAGE_LENGTH on the way into the
+        DB (ChatRequest validator + messages CHECK), so no re-slicing here.
         """
-        logger.debug(f"Final prompt length: {len(prompt)} chars")
+        prompt = self._preamble + "\n".join(
+            f"{msg['role']}: {msg['content']}" for msg in messages
+        )
+        logger.debug("Final prompt length: %d chars", len(prompt))
         return prompt
 
-def _estimate_quality(self, summary: str) -> int:
-    """
-    Calculate summary quality score (1-5) using configurable thresholds.
-    Scoring logic:
-    1: Empty or very short (< min_length)
-    2: Plain text meeting minimum length
-    3: Basic bullet points (1-2 items)
-    5: Well-structured with multiple bullet points (≥ bullet_threshold)
-    """
-    if not summary.strip():
-        return 1
-        
-    lines = [line.strip() for line in summary.split('\n') if line.strip()]
-    has_bullets = any(line.startswith(('-', '*', '•')) for line in lines)
-    
-    # Use config thresholds with fallbacks
-    min_length = getattr(config, 'SUMMARY_QUALITY_THRESHOLDS', {}).get('min_length', 100)
-    bullet_threshold = getattr(config, 'SUMMARY_QUALITY_THRESHOLDS', {}).get('bullet_points', 3)
-    
-    if not lines:
-        return 1
-    elif has_bullets:
-        return 5 if len(lines) >= bullet_threshold else 3
-    else:
-        return 2 if len(summary) > min_length else 1
\ No newline at end of file
+    def _estimate_quality(self, summary: str) -> int:
+        """
+        Calculate summary quality score (1-5) using configurable thresholds.
+        Scoring logic:
+        1: Empty or very short (< min_length)
+        2: Plain text meeting minimum length
+        3: Basic bullet points (1-2 items)
+        5: Well-structured with multiple bullet points (≥ bullet_threshold)
+        """
+        # Single pass: count non-empty lines, stop once a bullet and enough lines are seen
+        non_empty = 0
+        has_bullets = False
+        for line in summary.split('\n'):
+            line = line.lstrip()
+            if not line:
+                continue
+            non_empty += 1
+            if not has_bullets and (line[0] in '-*' or line.startswith('•')):
+                has_bullets = True
+            if has_bullets and non_empty >= self._bullet_threshold:
+                break
+
+        if not non_empty:
+            return 1
+        elif has_bullets:
+            return 5 if non_empty >= self._bullet_threshold else 3
+        else:
+            return 2 if len(summary) > self._min_length else 1
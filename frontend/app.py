@@ -1,10 +1,14 @@
 import gradio as gr
+import asyncio
 import json
 import os
+from collections import deque
 from datetime import datetime
 from config import (
+    CHAT_WINDOW,
     DEFAULT_SESSION_PROMPT,
     SESSION_ID_LABEL,
+    SESSION_COMPACT_EVERY,
     TEXTBOX_LINES,
     SHOW_SESSION_ID,
     ENABLE_TTS,
@@ -12,34 +16,146 @@ from config import (
 )
 from client import api_client
 
+# Shared, never-mutated update sentinels
+_NOOP = gr.update()
+_AUDIO_CLEAR = gr.update(value=None)
+_INPUT_CLEAR = gr.update(value="")
+
+_DARCULA_CSS = """
+    :root {
+        --bg-color: #2b2b2b;
+        --text-color: #a9b7c6;
+        --primary-color: #4eade5;
+        --secondary-color: #323232;
+        --user-bubble: #214283;
+        --bot-bubble: #38546a;
+        --border-color: #3c3f41;
+    }
+    
+    body {
+        background-color: var(--bg-color) !important;
+        color: var(--text-color) !important;
+        font-family: 'Consolas', 'Monaco', monospace !important;
+    }
+    
+    footer {
+        display: none !important;
+    }
+
+    #tts_player {
+        display: none !important;
+    }
+    
+    [data-role="user"] {
+        background: var(--user-bubble) !important;
+        color: white !important;
+        margin-left: auto !important;
+        border-radius: 15px 15px 0 15px !important;
+        max-width: 85% !important;
+        padding: 12px !important;
+        border: none !important;
+    }
+    
+    [data-role="assistant"] {
+        background: var(--bot-bubble) !important;
+        color: white !important;
+        margin-right: auto !important;
+        border-radius: 15px 15px 15px 0 !important;
+        max-width: 85% !important;
+        padding: 12px !important;
+        border: none !important;
+    }
+    
+    #user_input {
+        background-color: var(--secondary-color) !important;
+        color: var(--text-color) !important;
+        border: 1px solid var(--border-color) !important;
+        border-radius: 8px !important;
+        width: 100% !important;
+    }
+    
+    #user_input::placeholder {
+        color: #6b6b6b !important;
+    }
+    
+    #send_btn {
+        background: var(--primary-color) !important;
+        color: white !important;
+        border: none !important;
+        border-radius: 8px !important;
+        margin-left: 10px !important;
+        max-width: 85px !important;
+    }
+    
+    #session_id, #tts_toggle {
+        background-color: var(--secondary-color) !important;
+        color: var(--text-color) !important;
+        border: 1px solid var(--border-color) !important;
+    }
+    
+    .label {
+        color: var(--text-color) !important;
+    }
+    """
+
+_LEGACY_SESSION_FILE = "session_cache.json"  # Single-object cache from older versions
+
 class ChatUI:
     def __init__(self):
-        self.session_file = "session_cache.json"
+        self.session_file = "session_cache.jsonl"  # One message per line, append-only
+        self.meta_file = "session_cache.meta"      # session_id + last_updated
+        self._saved_session_id = None
+        self._turns_since_compact = 0
+        self._background = set()  # Strong refs so fire-and-forget saves aren't GC'd
         self.setup_ui()
         self.ui.launch()
 
     def load_session(self):
-        if os.path.exists(self.session_file):
-            try:
-                with open(self.session_file, 'r') as f:
+        """Restore the session id and the last CHAT_WINDOW logged messages."""
+        try:
+            if os.path.exists(self.meta_file):
+                with open(self.meta_file, 'r') as f:
+                    session_id = json.load(f).get("session_id", "")
+                history = []
+                if os.path.exists(self.session_file):
+                    with open(self.session_file, 'r') as f:
+                        history = [json.loads(line) for line in deque(f, maxlen=CHAT_WINDOW)]
+                self._saved_session_id = session_id
+                return history, session_id
+            if os.path.exists(_LEGACY_SESSION_FILE):
+                with open(_LEGACY_SESSION_FILE, 'r') as f:
                     data = json.load(f)
-                    return data.get("history", []), data.get("session_id", "")
-            except:
-                pass
+                return data.get("history", [])[-CHAT_WINDOW:], data.get("session_id", "")
+        except:
+            pass
         return [], ""
 
-    def save_session(self, history, session_id):
-        with open(self.session_file, 'w') as f:
+    def save_session(self, new_messages, session_id, history):
+        """Append this turn's messages to the log.
+
+        The log is rewritten (trimmed to CHAT_WINDOW) only when the session changes
+        or every SESSION_COMPACT_EVERY turns.
+        """
+        self._turns_since_compact += 1
+        if session_id != self._saved_session_id or self._turns_since_compact >= SESSION_COMPACT_EVERY:
+            mode, lines = 'w', history[-CHAT_WINDOW:]
+            self._turns_since_compact = 0
+        else:
+            mode, lines = 'a', new_messages
+        with open(self.session_file, mode) as f:
+            f.writelines(json.dumps(msg) + "\n" for msg in lines)
+
+        with open(self.meta_file, 'w') as f:
             json.dump({
-                "history": history,
                 "session_id": session_id,
                 "last_updated": str(datetime.now())
             }, f)
+        self._saved_session_id = session_id
 
     def setup_ui(self):
-        with gr.Blocks(title="Kali Chat", css=self._darcula_css()) as self.ui:
-            self.history_state = gr.State([])
+        with gr.Blocks(title="Kali Chat", css=_DARCULA_CSS) as self.ui:
             initial_history, initial_session_id = self.load_session()
+            self.history_state = gr.State(initial_history)
 
             self.audio_player = gr.Audio(
                 visible=False,
@@ -103,112 +219,56 @@ class ChatUI:
                 outputs=[self.chat_display, self.user_input, self.session_id, self.audio_player, self.history_state]
             )
 
-    def _darcula_css(self):
-        return """
-        :root {
-            --bg-color: #2b2b2b;
-            --text-color: #a9b7c6;
-            --primary-color: #4eade5;
-            --secondary-color: #323232;
-            --user-bubble: #214283;
-            --bot-bubble: #38546a;
-            --border-color: #3c3f41;
-        }
-        
-        body {
-            background-color: var(--bg-color) !important;
-            color: var(--text-color) !important;
-            font-family: 'Consolas', 'Monaco', monospace !important;
-        }
-        
-        footer {
-            display: none !important;
-        }
-
-        #tts_player {
-            display: none !important;
-        }
-        
-        [data-role="user"] {
-            background: var(--user-bubble) !important;
-            color: white !important;
-            margin-left: auto !important;
-            border-radius: 15px 15px 0 15px !important;
-            max-width: 85% !important;
-            padding: 12px !important;
-            border: none !important;
-        }
-        
-        [data-role="assistant"] {
-            background: var(--bot-bubble) !important;
-            color: white !important;
-            margin-right: auto !important;
-            border-radius: 15px 15px 15px 0 !important;
-            max-width: 85% !important;
-            padding: 12px !important;
-            border: none !important;
-        }
-        
-        #user_input {
-            background-color: var(--secondary-color) !important;
-            color: var(--text-color) !important;
-            border: 1px solid var(--border-color) !important;
-            border-radius: 8px !important;
-            width: 100% !important;
-        }
-        
-        #user_input::placeholder {
-            color: #6b6b6b !important;
-        }
-        
-        #send_btn {
-            background: var(--primary-color) !important;
-            color: white !important;
-            border: none !important;
-            border-radius: 8px !important;
-            margin-left: 10px !important;
-            max-width: 85px !important;
-        }
-        
-        #session_id, #tts_toggle {
-            background-color: var(--secondary-color) !important;
-            color: var(--text-color) !important;
-            border: 1px solid var(--border-color) !important;
-        }
-        
-        .label {
-            color: var(--text-color) !important;
-        }
-        """
-
     async def process_message(self, message: str, session_id: str, tts_enabled: bool = False, history: list = None):
         if not message.strip():
-            return gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
-
-        response = await api_client.send_to_llm(message, session_id or None)
+            yield (_NOOP,) * 5
+            return
 
-        audio_update = gr.update(value=None)
-        if ENABLE_TTS and tts_enabled and response.get("audio"):
-            audio_update = gr.update(
-                value=response["audio"],
-                autoplay=True,
-                visible=False
-            )
-
-        updated_history = (history or []) + [
+        want_audio = ENABLE_TTS and tts_enabled
+        turn = [
             {"role": "user", "content": message},
-            {"role": "assistant", "content": response["text"]}
+            {"role": "assistant", "content": ""}
         ]
+        updated_history = (history or []) + turn
 
-        self.save_session(updated_history, response["session_id"])
-
-        return (
+        # Echo the user message immediately, then grow the reply as deltas arrive
+        yield (
             gr.update(value=updated_history),
-            gr.update(value=""),
-            gr.update(value=response["session_id"]),
-            audio_update,
+            _INPUT_CLEAR,
+            _NOOP,
+            _AUDIO_CLEAR,
             updated_history
         )
 
+        reply = ""
+        async for event in api_client.stream_to_llm(message, session_id or None):
+            reply += event["text"]
+            session_id = event["session_id"]
+            turn[1] = updated_history[-1] = {"role": "assistant", "content": reply}
+            yield (
+                gr.update(value=updated_history),
+                _NOOP,
+                gr.update(value=session_id),
+                _NOOP,
+                updated_history
+            )
+
+        task = asyncio.create_task(asyncio.to_thread(self.save_session, turn, session_id, updated_history))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+        if not want_audio or not reply:
+            return
+
+        audio_path = await api_client.synthesize(reply)
+        if audio_path:
+            yield (
+                _NOOP,
+                _NOOP,
+                _NOOP,
+                gr.update(value=audio_path, autoplay=True, visible=False),
+                updated_history
+            )
+
 if __name__ == "__main__":
     chat = ChatUI()
\ No newline at end of file
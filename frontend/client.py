@@ -1,11 +1,18 @@
+import asyncio
 import httpx
+import hashlib
+import json
 import uuid
 import os
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
 from config import (
     LLM_API_URL,
+    LLM_STREAM_URL,
     REQUEST_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
     ENABLE_TTS,
     TTS_ENGINE,
     TTS_VOICE,
@@ -51,7 +58,7 @@ class TTSEngine:
             return None
 
         # Create cache-friendly filename
-        text_hash = str(abs(hash(text)))
+        text_hash = hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()  # Stable across restarts
         audio_path = self.cache_dir / f"{text_hash}.mp3"
 
         # Return cached file if exists and fresh
@@ -88,14 +95,27 @@ class APIClient:
     """Handles all LLM API communication"""
     def __init__(self):
         self.tts = TTSEngine() if ENABLE_TTS else None
-        self.client = httpx.AsyncClient(timeout=REQUEST_TIMEOUT)
+        self.client = httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            http2=True,  # Used over TLS; plain http:// stays HTTP/1.1 keep-alive
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            )
+        )
 
     async def send_to_llm(
         self,
         message: str,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        with_audio: bool = True
     ) -> Dict[str, Any]:
-        """Send message to LLM API and return processed response"""
+        """Send message to LLM API and return processed response.
+
+        Pass ``with_audio=False`` to get the text back without waiting on TTS,
+        then render it separately via ``synthesize``.
+        """
         try:
             payload = {
                 "message": message,
@@ -111,8 +131,8 @@ class APIClient:
             data = response.json()
             audio_path = None
             
-            if self.tts and "response" in data:
-                audio_path = self.tts.generate_audio(data["response"])
+            if with_audio and "response" in data:
+                audio_path = await self.synthesize(data["response"])
             
             return {
                 "text": data.get("response", ""),
@@ -133,6 +153,54 @@ class APIClient:
                 "audio": None
             }
 
+    async def stream_to_llm(
+        self,
+        message: str,
+        session_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, str]]:
+        """Yield ``{"text": delta, "session_id": id}`` as the API streams the reply.
+
+        The ``session_id`` is the one the backend resolved (``X-Session-ID``), so a
+        replacement session is picked up from the first delta. Errors are yielded
+        as a final text delta, matching ``send_to_llm``'s error strings.
+        """
+        payload = {"message": message}
+        if session_id:
+            payload["session_id"] = session_id
+        try:
+            # POST keeps the message in the body, out of the URL and access logs
+            async with self.client.stream("POST", LLM_STREAM_URL, json=payload) as response:
+                response.raise_for_status()
+                session_id = response.headers.get("X-Session-ID", session_id or "")
+                event, data = None, []
+                async for line in response.aiter_lines():
+                    if line:
+                        field, _, value = line.partition(":")
+                        if value.startswith(" "):
+                            value = value[1:]
+                        if field == "event":
+                            event = value
+                        elif field == "data":
+                            data.append(value)
+                        continue  # Comments (":...") and unknown fields are ignored
+                    # Blank line: dispatch the event
+                    if event in ("end", "error"):
+                        return
+                    if data:
+                        # Each delta is a JSON string, so newlines inside it survive framing
+                        yield {"text": json.loads("\n".join(data)), "session_id": session_id}
+                    event, data = None, []
+        except httpx.HTTPStatusError as e:
+            yield {"text": f"API Error: {e.response.status_code}", "session_id": session_id or ""}
+        except Exception as e:
+            yield {"text": f"System Error: {str(e)}", "session_id": session_id or ""}
+
+    async def synthesize(self, text: str) -> Optional[str]:
+        """Render TTS in a worker thread so gTTS/pyttsx3 don't block the event loop"""
+        if not self.tts:
+            return None
+        return await asyncio.to_thread(self.tts.generate_audio, text)
+
     async def close(self):
         """Cleanup resources"""
         await self.client.aclose()
@@ -1,6 +1,10 @@
 # Core API Configuration
 LLM_API_URL = "http://localhost:8000/chat"  # Your existing LLM API endpoint
+LLM_STREAM_URL = "http://localhost:8000/chat/stream"  # SSE variant used by the chat UI
 REQUEST_TIMEOUT = 30  # Seconds before HTTP calls fail
+HTTP_MAX_CONNECTIONS = 100  # Pooled connections to the API
+HTTP_KEEPALIVE_CONNECTIONS = 20  # Idle connections kept open for reuse
+HTTP_KEEPALIVE_EXPIRY = 60  # Seconds an idle connection is kept
 
 # Session Behavior
 DEFAULT_SESSION_PROMPT = "Paste Session ID (blank for new)"
@@ -23,6 +27,8 @@ TTS_SPEED = 1.0  # 1.0 = normal speed, 0.5-2.0 supported by most engines
 TEXTBOX_LINES = 4  # Height of user input box
 AUTOPLAY_AUDIO = False  # Play TTS automatically (False requires play button)
 SHOW_SESSION_ID = True  # Display session ID field (False hides it)
+CHAT_WINDOW = 50  # Messages restored from session_cache.jsonl on startup
+SESSION_COMPACT_EVERY = 25  # Turns between rewrites of the append-only session log
 
 # System TTL (Time-To-Live) Settings
 TTS_CACHE_TTL = 300  # Seconds to keep generated audio files (5min)
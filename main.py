@@ -1,50 +1,74 @@
+import asyncio
 import logging
+import logging.handlers
+import os
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 from config import config
-from core.database import ChatDatabase
-from core.sessions import SessionManager
-from core.llm import DeepSeekLLM
-from core.summaries import SummaryService
-from core.api import create_api_router
+from core.api import create_api_router, get_services
 
 # ====================== LOGGING SETUP ======================
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+def _log_handlers() -> list:
+    """Console always; in debug also logs/app.log, batched through a MemoryHandler."""
+    handlers = [logging.StreamHandler()]
+    if config.DEBUG:
+        os.makedirs('logs', exist_ok=True)
+        file_handler = logging.FileHandler('logs/app.log')
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))  # MemoryHandler doesn't format
+        handlers.append(logging.handlers.MemoryHandler(
+            capacity=1024,
+            flushLevel=logging.ERROR,
+            target=file_handler
+        ))
+    return handlers
+
 logging.basicConfig(
     level=logging.DEBUG if config.DEBUG else logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('logs/app.log') if config.DEBUG else None
-    ]
+    format=LOG_FORMAT,
+    handlers=_log_handlers()
 )
+if not config.DEBUG:
+    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)  # No per-request access lines
 logger = logging.getLogger(__name__)
 
 # ====================== LIFESPAN MANAGEMENT ======================
+async def _checkpoint_wal(db) -> None:
+    """Periodically checkpoint the WAL in a worker thread so writers never pay for it."""
+    while True:
+        await asyncio.sleep(config.SQLITE_CHECKPOINT_INTERVAL)
+        try:
+            await asyncio.to_thread(db.checkpoint)
+        except Exception as e:
+            logger.warning(f"WAL checkpoint failed: {str(e)}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Enhanced lifespan manager with startup/shutdown logging."""
+    checkpoint_task = cleanup_task = session_manager = llm = db = None
     try:
         logger.info("Starting application services...")
         
-        # Initialize core services
-        db = ChatDatabase(config.DATABASE_PATH)
-        session_manager = SessionManager(
-            session_dir=config.SESSION_DIR,
-            ttl_days=config.SESSION_TTL_DAYS
-        )
-        llm = DeepSeekLLM()
-        summary_service = SummaryService(db)
+        # Reuse the core services already built for the API router
+        db, session_manager, llm, summary_service, _ = get_services()
         
         # Verify services
         await llm.health_check()  # Pre-flight LLM check
-        session_manager.cleanup_expired()  # Initial cleanup
+        # Initial cleanup runs in a worker thread so startup doesn't wait on unlinks
+        cleanup_task = asyncio.create_task(asyncio.to_thread(session_manager.cleanup_expired))
         
         # Inject dependencies
         app.state.db = db
         app.state.session_manager = session_manager
         app.state.llm = llm
         app.state.summary_service = summary_service
+
+        # Background WAL maintenance
+        if config.SQLITE_JOURNAL_MODE == "WAL" and config.SQLITE_CHECKPOINT_INTERVAL > 0:
+            checkpoint_task = asyncio.create_task(_checkpoint_wal(db))
         
         logger.info(f"Services initialized | Debug: {config.DEBUG} | Persistence Default: {config.PERSISTENT_SESSIONS_DEFAULT}")
         yield
@@ -54,7 +78,16 @@ async def lifespan(app: FastAPI):
         raise
     finally:
         logger.info("Shutting down services...")
-        db.close_all()
+        if checkpoint_task:
+            checkpoint_task.cancel()
+        if cleanup_task and not cleanup_task.done():
+            await asyncio.wait([cleanup_task])  # Let in-flight deletes finish before teardown
+        if session_manager:
+            session_manager.flush_pending()  # Buffered ephemeral metadata
+        if llm:
+            await llm.close()
+        if db:
+            db.close_all()
         logger.info("Application shutdown complete")
 
 # ====================== APPLICATION FACTORY ======================
@@ -63,6 +96,7 @@ def create_app() -> FastAPI:
         title="Chatbot API",
         lifespan=lifespan,
         debug=config.DEBUG,
+        default_response_class=ORJSONResponse,
         description=f"API for conversational AI | Default persistence: {config.PERSISTENT_SESSIONS_DEFAULT}",
         version="1.0.0"
     )
@@ -81,6 +115,24 @@ def create_app() -> FastAPI:
     return app
 
 # ====================== ENTRY POINT ======================
+def _event_loop() -> str:
+    """Pick uvicorn's loop: uvloop when enabled and installed, else asyncio."""
+    if config.USE_UVLOOP:
+        try:
+            import uvloop  # noqa: F401
+            return "uvloop"
+        except ImportError:
+            logger.warning("USE_UVLOOP is set but uvloop is not installed - using asyncio")
+    return "asyncio"
+
+def _http_parser() -> str:
+    """Prefer the C httptools parser over pure-Python h11 when it is installed."""
+    try:
+        import httptools  # noqa: F401
+        return "httptools"
+    except ImportError:
+        return "h11"
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:create_app",
@@ -88,6 +140,9 @@ if __name__ == "__main__":
         port=config.API_PORT,
         reload=config.DEBUG,
         factory=True,
+        loop=_event_loop(),
+        http=_http_parser(),
+        access_log=config.DEBUG,
         server_header=False,
         log_level="debug" if config.DEBUG else "info"
     )
\ No newline at end of file
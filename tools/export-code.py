@@ -1,28 +1,36 @@
 import os
-import glob
+from concurrent.futures import ThreadPoolExecutor
+
+FENCE_OPEN = b"\n```\n"
+FENCE_CLOSE = b"\n```\n"
+
+def export_file(python_file: str, output_dir: str) -> str:
+    """Copy one source file into the fenced .txt format with a single write."""
+    output_file = os.path.join(output_dir, f"{os.path.splitext(python_file)[0]}.txt")
+
+    # Bytes in, bytes out: no decode/encode round trip
+    with open(python_file, 'rb') as f:
+        content = f.read()
+
+    with open(output_file, 'wb') as f:
+        f.writelines((python_file.encode() + FENCE_OPEN, content, FENCE_CLOSE))
+
+    return output_file
 
 def export_python_files():
     # Create output directory if it doesn't exist
     output_dir = "python_exports"
     os.makedirs(output_dir, exist_ok=True)
     
-    # Process each Python file
-    for python_file in glob.glob('*.py'):
-        # Create output filename
-        output_file = os.path.join(output_dir, f"{os.path.splitext(python_file)[0]}.txt")
-        
-        # Read the Python file content
-        with open(python_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Write to output file in requested format
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(f"{python_file}\n")
-            f.write("```\n")
-            f.write(content)
-            f.write("\n```\n")
-        
-        print(f"Exported {python_file} to {output_file}")
+    # One directory read; DirEntry caches the file type
+    with os.scandir('.') as entries:
+        python_files = [e.name for e in entries if e.name.endswith('.py') and e.is_file()]
+
+    # I/O bound, so threads overlap the reads and writes despite the GIL
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        outputs = pool.map(export_file, python_files, [output_dir] * len(python_files))
+        for python_file, output_file in zip(python_files, outputs):
+            print(f"Exported {python_file} to {output_file}")
 
 if __name__ == "__main__":
     export_python_files()
@@ -6,43 +6,53 @@ Extracts chat history from SQLite database and exports to CSV
 import sqlite3
 import csv
 from pathlib import Path
+from typing import Iterator
 
 # Configuration
 DB_PATH = Path('data/chat.db')
 CSV_OUTPUT = Path('chat_history.csv')
+FETCH_SIZE = 1024  # Rows pulled from SQLite per fetchmany()
+MMAP_SIZE = 256 * 1024**2  # Bytes of the DB file read through mmap during the scan
 
-def extract_chat_data(db_path: Path) -> list[dict]:
-    """Extracts all messages from the database"""
-    conn = sqlite3.connect(db_path)
+# Statement texts are module constants so repeated calls reuse the connection's
+# prepared-statement cache instead of recompiling
+SQL_LIST_TABLES = "SELECT name FROM sqlite_master WHERE type='table'"
+SQL_SELECT_MESSAGES = "SELECT * FROM messages ORDER BY timestamp ASC"  # Modify based on your schema
+SQL_MMAP_SIZE = f"PRAGMA mmap_size={MMAP_SIZE}"
+
+def extract_chat_data(conn: sqlite3.Connection) -> Iterator[sqlite3.Row]:
+    """Streams all messages from the database, FETCH_SIZE rows at a time"""
     conn.row_factory = sqlite3.Row  # Enable column name access
-    
-    try:
-        # Get all tables for debugging
-        tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
-        print(f"Found tables: {[t['name'] for t in tables]}")
-
-        # Fetch all messages (modify query based on your schema)
-        cursor = conn.execute("""
-            SELECT * FROM messages 
-            ORDER BY timestamp ASC
-        """)
-        
-        return [dict(row) for row in cursor]
-    
-    finally:
-        conn.close()
+    conn.execute(SQL_MMAP_SIZE)  # Read-only bulk scan; journal settings are left to the app
 
-def save_to_csv(data: list[dict], output_path: Path):
-    """Saves extracted data to CSV"""
-    if not data:
+    # Get all tables for debugging
+    tables = conn.execute(SQL_LIST_TABLES).fetchall()
+    print(f"Found tables: {[t['name'] for t in tables]}")
+
+    cursor = conn.execute(SQL_SELECT_MESSAGES)
+    while rows := cursor.fetchmany(FETCH_SIZE):
+        yield from rows
+
+def save_to_csv(data: Iterator[sqlite3.Row], output_path: Path):
+    """Saves extracted data to CSV without holding every row in memory"""
+    first = next(data, None)
+    if first is None:
         print("⚠️ No data to export")
         return
 
+    count = 1
+    def rows():
+        nonlocal count
+        for row in data:
+            count += 1
+            yield tuple(row)
+
     with open(output_path, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=data[0].keys())
-        writer.writeheader()
-        writer.writerows(data)
-    print(f"✅ Saved {len(data)} messages to {output_path}")
+        writer = csv.writer(f)
+        writer.writerow(first.keys())
+        writer.writerow(tuple(first))
+        writer.writerows(rows())
+    print(f"✅ Saved {count} messages to {output_path}")
 
 if __name__ == '__main__':
     # Create output directory if needed
@@ -53,5 +63,8 @@ if __name__ == '__main__':
         raise FileNotFoundError(f"Database not found at {DB_PATH}")
     
     # Extract and export data
-    chat_data = extract_chat_data(DB_PATH)
-    save_to_csv(chat_data, CSV_OUTPUT)
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        save_to_csv(extract_chat_data(conn), CSV_OUTPUT)
+    finally:
+        conn.close()
@@ -1,15 +1,18 @@
 from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Tuple
+import functools
 import re
 import chromadb
-from chromadb.utils import embedding_functions
-from sentence_transformers import SentenceTransformer
+from chromadb.config import Settings
+from embedder import load_embedding_model
+from snippets import leading_words, word_window
 from keybert import KeyBERT
 from config import (
     CHROMA_PATH,
     EMBEDDING_MODEL,
     KEYWORD_SETTINGS,
+    QUERY_CACHE_SIZE,
     SUMMARY_MAX_WORDS
 )
 import logging
@@ -35,18 +38,13 @@ class SearchResponse(BaseModel):
 # --- Initialize Services ---
 try:
     logger.info("Loading embedding model...")
-    embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+    embedding_model = load_embedding_model()  # Shared with KeyBERT below
     kw_model = KeyBERT(model=embedding_model)
     
     logger.info("Connecting to ChromaDB...")
-    chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
-    embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name=EMBEDDING_MODEL
-    )
-    chroma_collection = chroma_client.get_collection(
-        name="legal_docs",
-        embedding_function=embedding_fn
-    )
+    chroma_client = chromadb.PersistentClient(path=CHROMA_PATH, settings=Settings(anonymized_telemetry=False))
+    # Query-only: /search passes query_embeddings, so no embedding_function is attached
+    chroma_collection = chroma_client.get_collection(name="legal_docs")
     doc_count = chroma_collection.count()
     logger.info(f"Collection contains {doc_count} documents")
     
@@ -55,6 +53,10 @@ except Exception as e:
     raise RuntimeError(f"Service initialization failed: {str(e)}")
 
 # --- Helper Functions ---
+_SECTION_RE = re.compile(r"(Article|Section|§)\s+\d+[\.\d]*")  # Applied with .match(), i.e. anchored
+
+# Both caches live for the process, so they are implicitly keyed on the loaded EMBEDDING_MODEL
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
 def refine_query(question: str) -> str:
     try:
         if not question.strip():
@@ -65,6 +67,11 @@ def refine_query(question: str) -> str:
         logger.error(f"Query refinement failed: {str(e)}")
         return question  # Fallback to original query
 
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _embed_query(refined_q: str) -> Tuple[float, ...]:
+    """Normalized query vector for `refined_q` (a tuple, so cached entries can't be mutated)."""
+    return tuple(embedding_model.encode(refined_q, normalize_embeddings=True, convert_to_numpy=True).tolist())
+
 def extract_section_header(text: str, position: int) -> Optional[str]:
     try:
         prev_newline = text.rfind("\n\n", 0, position)
@@ -72,35 +79,29 @@ def extract_section_header(text: str, position: int) -> Optional[str]:
             return None
         
         candidate = text[prev_newline:position].strip()
-        section_pattern = re.compile(r"^(Article|Section|§)\s+\d+[\.\d]*")
-        if match := section_pattern.search(candidate):
+        if match := _SECTION_RE.match(candidate):
             return match.group(0)
         return None
     except Exception:
         return None
 
+def _keyword_pattern(keywords: List[str]) -> Optional["re.Pattern[str]"]:
+    """One case-insensitive alternation so a single scan finds the first keyword hit."""
+    terms = [re.escape(kw) for kw in keywords if kw]
+    return re.compile("|".join(terms), re.IGNORECASE) if terms else None
+
 def extract_relevant_snippet(full_text: str, keywords: List[str]) -> str:
     try:
         if not full_text:
             return "No content available"
-            
-        if not keywords:
-            return " ".join(full_text.split()[:SUMMARY_MAX_WORDS])
-            
-        positions = [full_text.lower().find(kw.lower()) for kw in keywords if kw]
-        valid_positions = [p for p in positions if p > -1]
-        
-        if not valid_positions:
-            return " ".join(full_text.split()[:SUMMARY_MAX_WORDS])
-            
-        first_pos = min(valid_positions)
-        words = full_text.split()
-        word_pos = len(full_text[:first_pos].split())
-        
-        start = max(0, word_pos - SUMMARY_MAX_WORDS//2)
-        end = min(len(words), word_pos + SUMMARY_MAX_WORDS//2)
-        
-        snippet = " ".join(words[start:end])
+
+        pattern = _keyword_pattern(keywords)
+        match = pattern.search(full_text) if pattern else None
+        if not match:
+            return leading_words(full_text, SUMMARY_MAX_WORDS)
+
+        first_pos = match.start()
+        snippet = word_window(full_text, first_pos, SUMMARY_MAX_WORDS)
         if header := extract_section_header(full_text, first_pos):
             snippet = f"{header}\n\n{snippet}"
         
@@ -126,7 +127,7 @@ async def search(
         # Safely query ChromaDB
         try:
             results = chroma_collection.query(
-                query_texts=[refined_q],
+                query_embeddings=[list(_embed_query(refined_q))],
                 n_results=n_results,
                 include=["documents", "metadatas", "distances"]
             )
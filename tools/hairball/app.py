@@ -1,22 +1,23 @@
 from flask import Flask, request, jsonify, render_template_string
 import chromadb
-from chromadb.utils import embedding_functions
-from sentence_transformers import SentenceTransformer
+from chromadb.config import Settings
+from embedder import load_embedding_model
+from snippets import leading_words, word_window
 from keybert import KeyBERT
+import functools
 import logging
+from typing import Tuple
 from textwrap import fill
+from config import (  # Shared config
+    CHROMA_PATH,
+    KEYWORD_SETTINGS,
+    QUERY_CACHE_SIZE
+)
 
 # ======== CONFIGURATION ======== #
-CHROMA_PATH = "./chroma_db"
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 COLLECTION_NAME = "legal_docs"
 
 # Search parameters
-KEYWORD_SETTINGS = {
-    "keyphrase_ngram_range": (1, 2),
-    "stop_words": "english",
-    "top_n": 5
-}
 SEARCH_RESULT_WORDS = 500    # Words to show in search results
 TARGET_CONTEXT_WORDS = 1000  # Words around match to retrieve
 MAX_DOCUMENT_WORDS = 10000   # Full document view
@@ -31,24 +32,24 @@ logging.basicConfig(level=logging.INFO)
 
 try:
     # Load models
-    embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+    embedding_model = load_embedding_model()  # Shared with KeyBERT below
     kw_model = KeyBERT(model=embedding_model)
     
     # Connect to ChromaDB
-    chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
-    embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name=EMBEDDING_MODEL
-    )
-    collection = chroma_client.get_collection(
-        name=COLLECTION_NAME,
-        embedding_function=embedding_fn
-    )
+    chroma_client = chromadb.PersistentClient(path=CHROMA_PATH, settings=Settings(anonymized_telemetry=False))
+    # Query-only: searches pass query_embeddings, so no embedding_function is attached
+    collection = chroma_client.get_collection(name=COLLECTION_NAME)
     logging.info(f"Connected to ChromaDB collection with {collection.count()} documents")
 except Exception as e:
     logging.error(f"Initialization failed: {str(e)}")
     raise
 
 # ======== HELPER FUNCTIONS ======== #
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def embed_query(text: str) -> Tuple[float, ...]:
+    """Normalized query vector, memoized for repeat searches"""
+    return tuple(embedding_model.encode(text, normalize_embeddings=True, convert_to_numpy=True).tolist())
+
 def get_words_around_match(full_text: str, keyword: str, num_words: int) -> str:
     """Extract words around the first keyword match"""
     try:
@@ -57,16 +58,9 @@ def get_words_around_match(full_text: str, keyword: str, num_words: int) -> str:
         pos = text_lower.find(keyword_lower)
         
         if pos == -1:
-            return " ".join(full_text.split()[:num_words])
-            
-        words = full_text.split()
-        pre_text = full_text[:pos]
-        word_pos = len(pre_text.split())
-        
-        start = max(0, word_pos - num_words//2)
-        end = min(len(words), word_pos + num_words//2)
-        
-        return " ".join(words[start:end])
+            return leading_words(full_text, num_words)
+
+        return word_window(full_text, pos, num_words)
     except Exception:
         return full_text[:num_words*6]  # Fallback
 
@@ -95,7 +89,7 @@ def api_search():
         # Extract keywords and search
         keywords = [kw[0] for kw in kw_model.extract_keywords(query, **KEYWORD_SETTINGS)]
         results = collection.query(
-            query_texts=[" ".join(keywords)],
+            query_embeddings=[list(embed_query(" ".join(keywords)))],
             n_results=RESULTS_PER_PAGE,
             include=["documents", "metadatas", "distances"]
         )
@@ -244,4 +238,7 @@ def ui():
     return render_template_string(HTML_TEMPLATE)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # One process owns the model and the HNSW index; requests share them on threads
+    # (encode/query release the GIL). The debug reloader would load both twice.
+    # Production: gunicorn -w 1 -k gthread --threads 8 -b 0.0.0.0:5000 app:app
+    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
\ No newline at end of file
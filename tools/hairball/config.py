@@ -1,13 +1,41 @@
 CHROMA_PATH = "./chroma_db"
+CHROMA_COLLECTION_METADATA = {  # HNSW build/search tunables; applied when the collection is created
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": 200,
+    "hnsw:M": 32,
+    "hnsw:search_ef": 64
+}
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
 # Keyword extraction settings
+KEYWORD_MODEL = None  # None = reuse the embedder; e.g. "minishlab/potion-base-8M" (model2vec static embeddings)
 KEYWORD_SETTINGS = {
     "keyphrase_ngram_range": (1, 2),
     "stop_words": "english",
     "top_n": 5
 }
 
+# Search-side caching (app.py / app-cli.py)
+QUERY_CACHE_SIZE = 4096   # Distinct queries whose refined text + embedding are memoized
+
 # Text processing limits
 EXTRACT_WORDS = 400       # Words used for summarization
-SUMMARY_MAX_WORDS = 300   # Max words in generated summary
\ No newline at end of file
+SUMMARY_MAX_WORDS = 300   # Max words in generated summary
+
+# Summarizer (txt-chroma.py)
+SUMMARIZER_BACKEND = "extractive"  # "extractive" (embedding-ranked sentences) or "abstractive" (seq2seq below)
+SUMMARY_SCAN_WORDS = 2000  # Extractive: words at the head of each document considered for sentences
+SUMMARY_SENTENCES = 5      # Extractive: sentences kept per summary (capped at SUMMARY_MAX_WORDS)
+SUMMARIZER_MODEL = "facebook/bart-large-cnn"  # Abstractive; "sshleifer/distilbart-cnn-6-6" is ~2x faster
+SUMMARIZER_DTYPE = "bfloat16"  # CPU weight dtype (float16 on CUDA); the LM head always runs in float32
+
+# Ingestion batching (txt-chroma.py)
+EMBED_BATCH_SIZE = 32     # Documents per embedding forward pass
+SUMMARY_BATCH_SIZE = 8    # Documents per summarizer forward pass
+READ_WORKERS = 8          # Threads reading and hashing input files
+
+# Embedding inference
+EMBEDDING_BACKEND = "torch"  # "torch" or "onnx" (INT8 ONNX export via onnxruntime; re-ingest after switching)
+QUANTIZE_EMBEDDINGS = False  # torch backend: INT8 dynamic quantization of Linear layers (CPU only; re-ingest after toggling)
+ONNX_MODEL_DIR = "./models/minilm-onnx-int8"  # Exported on first use of the onnx backend
+ONNX_QUANTIZATION = "avx512_vnni"  # Or "avx2", "avx512", "arm64" to match the host CPU
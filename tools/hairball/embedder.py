@@ -0,0 +1,60 @@
+"""
+Shared SentenceTransformer loader for the hairball scripts.
+- One place to apply inference-time optimizations (see config.py)
+- The returned model is also what KeyBERT and Chroma should wrap
+"""
+
+import platform
+from pathlib import Path
+import torch
+from chromadb import Documents, EmbeddingFunction, Embeddings
+from sentence_transformers import SentenceTransformer
+from config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    QUANTIZE_EMBEDDINGS,
+    ONNX_MODEL_DIR,
+    ONNX_QUANTIZATION
+)
+
+ONNX_PROVIDER = "CPUExecutionProvider"
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+def _onnx_file_name() -> str:
+    return f"onnx/model_qint8_{ONNX_QUANTIZATION}.onnx"
+
+def export_onnx_model() -> None:
+    """One-time export of EMBEDDING_MODEL to a dynamically quantized INT8 ONNX graph."""
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+    model = SentenceTransformer(EMBEDDING_MODEL, backend="onnx")
+    model.save(ONNX_MODEL_DIR)
+    export_dynamic_quantized_onnx_model(model, ONNX_QUANTIZATION, ONNX_MODEL_DIR)
+
+def load_embedding_model() -> SentenceTransformer:
+    if EMBEDDING_BACKEND == "onnx":
+        if not (Path(ONNX_MODEL_DIR) / _onnx_file_name()).exists():
+            export_onnx_model()
+        return SentenceTransformer(
+            ONNX_MODEL_DIR,
+            backend="onnx",
+            model_kwargs={"provider": ONNX_PROVIDER, "file_name": _onnx_file_name()}
+        )
+
+    model = SentenceTransformer(EMBEDDING_MODEL, device=DEVICE)
+    if DEVICE == "cuda":
+        model.half()  # FP16 on tensor cores; int8 dynamic quantization is CPU-only
+    elif QUANTIZE_EMBEDDINGS:
+        arm = platform.machine().lower() in ("arm64", "aarch64")
+        torch.backends.quantized.engine = "qnnpack" if arm else "fbgemm"
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+class ModelEmbeddingFunction(EmbeddingFunction):
+    """Chroma embedding function backed by an already-loaded model, so stored and
+    query vectors come from the same weights (and the model is loaded once)."""
+
+    def __init__(self, model: SentenceTransformer):
+        self.model = model
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.model.encode(list(input), convert_to_numpy=True).tolist()
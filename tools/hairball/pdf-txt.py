@@ -13,8 +13,13 @@ import logging
 import unicodedata
 import fitz  # PyMuPDF
 from pathlib import Path
-from typing import Optional, List, Tuple, Dict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, Optional, List, Tuple, Dict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import re2  # pip install google-re2: linear-time matching, no catastrophic backtracking
+except ImportError:
+    re2 = None
 
 # Configure logging
 logging.basicConfig(
@@ -26,6 +31,21 @@ logging.basicConfig(
     ]
 )
 
+def _compile_linear(pattern: str, flags: int = 0):
+    """Compile with RE2 when it is installed and supports the pattern, else with stdlib re.
+
+    RE2 takes inline flags only, and has no lookarounds or backreferences; patterns
+    using those stay on re.
+    """
+    if re2 is not None:
+        inline = ('i' if flags & re.IGNORECASE else '') + ('m' if flags & re.MULTILINE else '')
+        try:
+            return re2.compile(f'(?{inline}){pattern}' if inline else pattern)
+        except re2.error:
+            pass
+    return re.compile(pattern, flags)
+
+
 class PDFProcessor:
     """Enhanced PDF processing with academic-focused cleaning."""
     
@@ -57,74 +77,101 @@ class PDFProcessor:
         'CONCLUSION': '[CONCLUSION]'
     }
     
-    def __init__(self, max_workers: int = 4):
+    # Fraction of the page height treated as running header/footer
+    HEADER_FOOTER_MARGIN = 0.10
+    # Pages with this many lines or fewer are never trimmed
+    HEADER_FOOTER_MIN_LINES = 10
+    
+    def __init__(self, max_workers: int = 4, force: bool = False):
         self.max_workers = max_workers
+        self.force = force  # Reprocess PDFs whose output is already up to date
         self._compile_patterns()
         
     def _compile_patterns(self):
-        """Compile all regex patterns once at init."""
-        self.citation_pattern = re.compile(
-            '|'.join(self.BLUEBOOK_PATTERNS),
-            flags=re.IGNORECASE | re.MULTILINE
-        )
-        
-        self.footnote_pattern = re.compile(
-            r'(?:^|\n)\s*([*‡†§]|\d+\.?)\s+.*?(?:' + 
-            '|'.join(self.FOOTNOTE_INDICATORS) + ').*?(?=\n|$)',
-            flags=re.IGNORECASE | re.MULTILINE
-        )
-        
-        self.url_pattern = re.compile(
-            r'<?(?:https?|www)\S+>?',
-            flags=re.IGNORECASE
-        )
+        """Bind the module-level patterns, compiled once per process."""
+        self.citation_pattern = _CITATION_RE
+        self.citation_hint_pattern = _CITATION_HINT_RE
+        self.footnote_pattern = _FOOTNOTE_RE
+        self.url_whitespace_pattern = _URL_WHITESPACE_RE
+        self.paragraph_break_pattern = _PARAGRAPH_BREAK_RE
+        self.section_header_pattern = _SECTION_HEADER_RE
+        self.hyphen_pattern = _HYPHEN_RE
+        self.orphan_marker_pattern = _ORPHAN_MARKER_RE
+        self.punct_table = _PUNCT_TABLE
+    
+    def iter_page_texts(self, pdf_path: Path) -> Iterator[str]:
+        """Yield each page's text with layout preservation, one page at a time."""
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                # Text blocks with their bounding boxes, minimal formatting
+                blocks = page.get_text("blocks", flags=fitz.TEXT_PRESERVE_LIGATURES)
+                
+                # Short pages are kept whole, as with the old line-count heuristic
+                if sum(block[4].count("\n") for block in blocks) <= self.HEADER_FOOTER_MIN_LINES:
+                    yield "\n".join(block[4] for block in blocks)
+                    continue
+                
+                # Header/footer detection by position: drop blocks lying wholly inside the top/bottom margin
+                top = page.rect.height * self.HEADER_FOOTER_MARGIN
+                bottom = page.rect.height - top
+                yield "\n".join(block[4] for block in blocks if block[3] > top and block[1] < bottom)
+    
+    @staticmethod
+    def _content_end(text: str, end: int) -> int:
+        """Index just past the last non-whitespace character before end."""
+        while end and text[end - 1].isspace():
+            end -= 1
+        return end
+    
+    def _page_break(self, block: str) -> int:
+        """Offset of the last newline in block that no hyphenated word spans, or -1.
         
-        self.section_header_pattern = re.compile(
-            r'^(?P<header>' + '|'.join(re.escape(k) + r'\b' for k in self.SECTION_TAGS.keys()) + ')',
-            flags=re.MULTILINE
-        )
+        Works on indices only; no stripped or split copies of the page are made.
+        """
+        cut = block.rfind("\n", 0, self._content_end(block, len(block)))
+        while cut > 0:
+            end = self._content_end(block, cut)
+            if block[end - 1:end] != "-":
+                break
+            cut = block.rfind("\n", 0, end)
+        return cut
     
-    def extract_text(self, pdf_path: Path) -> Optional[str]:
-        """Improved text extraction with layout preservation."""
-        try:
-            text = ""
-            with fitz.open(pdf_path) as doc:
-                for page in doc:
-                    # Get text with minimal formatting
-                    page_text = page.get_text("text", flags=fitz.TEXT_PRESERVE_LIGATURES)
-                    
-                    # Simple header/footer detection (top/bottom 10% of page)
-                    if len(page_text.splitlines()) > 10:
-                        lines = page_text.splitlines()
-                        body_lines = lines[2:-2]  # Skip first/last 2 lines
-                        page_text = "\n".join(body_lines)
-                    
-                    text += page_text + "\n"
-            return text if text.strip() else None
-        except Exception as e:
-            logging.error(f"Extraction failed for {pdf_path}: {str(e)}")
-            return None
+    def iter_cleaned_pages(self, pdf_path: Path) -> Iterator[str]:
+        """Run the cleaning pipeline page by page so only one page is held at a time.
+        
+        The last line of each page is carried into the next, so words hyphenated
+        or citations split across a page break are still repaired/removed.
+        """
+        carry = ""
+        for page_text in self.iter_page_texts(pdf_path):
+            block = self.remove_citations(f"{carry}\n{page_text}" if carry else page_text)
+            cut = self._page_break(block)
+            if cut == -1:
+                carry = block
+                continue
+            carry = block[cut + 1:]
+            yield self.clean_text(block[:cut])
+        if carry:
+            yield self.clean_text(carry)
     
     def _repair_hyphenation(self, text: str) -> str:
         """Rejoin words split by hyphen+newline."""
-        return re.sub(
-            r'([a-z])-\s*\n\s*([a-z])', 
-            r'\1\2', 
-            text, 
-            flags=re.IGNORECASE
-        )
+        return self.hyphen_pattern.sub(r'\1\2', text)
     
-    def _normalize_whitespace(self, text: str) -> str:
-        """Clean up whitespace while preserving paragraphs."""
-        # Preserve intentional paragraph breaks
-        text = re.sub(r'(\S)\n\n(\S)', r'\1\n\n\2', text)
-        # Remove mid-paragraph line breaks
-        text = re.sub(r'(?<!\n)\n(?!\n)', ' ', text)
-        # Collapse multiple spaces
-        return re.sub(r'[ \t]+', ' ', text)
+    def _collapse_whitespace(self, text: str) -> str:
+        """Drop URLs and collapse whitespace to single spaces, keeping paragraph breaks."""
+        paragraphs = (
+            self.url_whitespace_pattern.sub(' ', paragraph).strip()
+            for paragraph in self.paragraph_break_pattern.split(text)
+        )
+        return '\n\n'.join(paragraph for paragraph in paragraphs if paragraph)
     
     def _tag_section_headers(self, text: str) -> str:
         """Convert section headers to tagged format."""
+        # Literal substring checks are one C-level search each; most pages have no header
+        if not any(header in text for header in self.SECTION_TAGS):
+            return text
+        
         def replace_match(match):
             header = match.group('header')
             return self.SECTION_TAGS.get(header, header)
@@ -134,6 +181,10 @@ class PDFProcessor:
     def remove_citations(self, text: str) -> str:
         """Enhanced citation/footnote removal."""
         try:
+            # Every citation/footnote/marker pattern needs one of these; stop at the first hit
+            if not self.citation_hint_pattern.search(text):
+                return text
+            
             # Remove standard citations
             text = self.citation_pattern.sub('', text)
             
@@ -141,12 +192,7 @@ class PDFProcessor:
             text = self.footnote_pattern.sub('', text)
             
             # Remove orphaned footnote markers
-            text = re.sub(
-                r'^\s*[*‡†§]|\d+\.?\s*$', 
-                '', 
-                text, 
-                flags=re.MULTILINE
-            )
+            text = self.orphan_marker_pattern.sub('', text)
             
             return text
         except Exception as e:
@@ -157,55 +203,62 @@ class PDFProcessor:
         """Comprehensive text normalization pipeline."""
         try:
             # Normalize Unicode first
-            text = unicodedata.normalize('NFKC', text)
+            if not text.isascii():  # NFKC leaves ASCII unchanged
+                text = unicodedata.normalize('NFKC', text)
             
             # Repair hyphenated words before other processing
             text = self._repair_hyphenation(text)
             
-            # Remove URLs
-            text = self.url_pattern.sub('', text)
-            
             # Tag section headers (must be before whitespace normalization)
             text = self._tag_section_headers(text)
             
-            # Normalize whitespace and punctuation
-            text = self._normalize_whitespace(text)
+            # Remove URLs and normalize whitespace (already stripped)
+            text = self._collapse_whitespace(text)
             
             # Standardize quotes/dashes
-            text = text.replace('“', '"').replace('”', '"')
-            text = text.replace('‘', "'").replace('’', "'")
-            text = text.replace('—', '--')
-            
-            # Final cleanup
-            text = re.sub(r'\s+', ' ', text).strip()
-            return text
+            return text.translate(self.punct_table)
         except Exception as e:
             logging.error(f"Text cleaning failed: {str(e)}")
             return text
     
     def process_pdf(self, pdf_path: Path, output_dir: Path) -> bool:
-        """Enhanced processing pipeline."""
+        """Enhanced processing pipeline, streamed to disk page by page."""
+        output_path = output_dir / f'{pdf_path.stem}_cleaned.txt'
+        tmp_path = output_path.with_name(output_path.name + '.tmp')
         try:
-            # Extract text with improved layout handling
-            raw_text = self.extract_text(pdf_path)
-            if not raw_text:
-                return False
+            # Incremental runs: output newer than its PDF is left as is
+            if not self.force:
+                try:
+                    if output_path.stat().st_mtime >= pdf_path.stat().st_mtime:
+                        logging.debug(f"Up to date, skipping {pdf_path}")
+                        return True
+                except FileNotFoundError:
+                    pass
             
-            # Apply cleaning pipeline
-            cleaned_text = self.remove_citations(raw_text)
-            cleaned_text = self.clean_text(cleaned_text)
+            # Cleaned pages join with a single space; page breaks mostly fall mid-paragraph
+            written = False
+            # Binary file with pre-encoded pages: no TextIOWrapper encoder/newline layer
+            with open(tmp_path, 'wb', buffering=1 << 20) as f:
+                for cleaned_page in self.iter_cleaned_pages(pdf_path):
+                    if not cleaned_page:
+                        continue
+                    if written:
+                        f.write(b' ')
+                    f.write(cleaned_page.encode('utf-8'))
+                    written = True
             
             # Validate output
-            if not cleaned_text.strip():
+            if not written:
                 logging.warning(f"Empty output for {pdf_path}")
+                tmp_path.unlink()
                 return False
             
-            # Save results
-            output_path = output_dir / f'{pdf_path.stem}_cleaned.txt'
-            output_path.write_text(cleaned_text, encoding='utf-8')
+            # Only complete files replace earlier results
+            os.replace(tmp_path, output_path)
             return True
         except Exception as e:
             logging.error(f"Processing failed for {pdf_path}: {str(e)}")
+            tmp_path.unlink(missing_ok=True)
             return False
     
     def process_directory(self, input_dir: Path, output_dir: Path) -> Tuple[int, int]:
@@ -217,7 +270,13 @@ class PDFProcessor:
         output_dir.mkdir(parents=True, exist_ok=True)
         
         # Get PDF files
-        pdf_files = list(input_dir.glob('*.pdf'))
+        with os.scandir(input_dir) as entries:
+            pdf_files = [
+                Path(entry.path) for entry in entries
+                if entry.name.lower().endswith('.pdf')
+                and not entry.name.startswith('.')
+                and entry.is_file()
+            ]
         if not pdf_files:
             logging.warning(f"No PDF files found in {input_dir}")
             return (0, 0)
@@ -226,10 +285,12 @@ class PDFProcessor:
         success_count = 0
         failure_count = 0
         
-        if self.max_workers > 1:
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+        workers = min(os.cpu_count() or 1, self.max_workers)
+        if workers > 1:
+            # Extraction and regex cleaning are CPU-bound Python; processes sidestep the GIL
+            with ProcessPoolExecutor(max_workers=workers) as executor:
                 futures = {
-                    executor.submit(self.process_pdf, pdf, output_dir): pdf
+                    executor.submit(_process_pdf, pdf, output_dir, self.force): pdf
                     for pdf in pdf_files
                 }
                 
@@ -253,6 +314,66 @@ class PDFProcessor:
         return (success_count, failure_count)
 
 
+# --- Compiled patterns (module scope: built once per process, shared by all instances) ---
+_CITATION_RE = _compile_linear(
+    '|'.join(PDFProcessor.BLUEBOOK_PATTERNS),
+    flags=re.IGNORECASE | re.MULTILINE
+)
+
+# Characters/literals at least one of which every pattern below requires:
+# digits (reporters, sections, footnote numbers), note markers, perma.cc links
+_CITATION_HINT_RE = re.compile(r'[\d*‡†§]|perma\.cc', flags=re.IGNORECASE)
+
+# [^\n] keeps each attempt inside one line; a greedy tail needs no (?=\n|$)
+_FOOTNOTE_RE = _compile_linear(
+    r'(?:^|\n)\s*([*‡†§]|\d+\.?)\s+[^\n]*?(?:' + 
+    '|'.join(PDFProcessor.FOOTNOTE_INDICATORS) + r')[^\n]*',
+    flags=re.IGNORECASE | re.MULTILINE
+)
+
+# URLs (with the whitespace around them) and bare whitespace runs both
+# become one space, so a single scan does removal and collapse together
+_URL_WHITESPACE_RE = _compile_linear(
+    r'\s*(?:<?(?:https?|www)\S+>?\s*)+|\s+',
+    flags=re.IGNORECASE
+)
+
+# Blank line (possibly holding spaces/tabs) between paragraphs
+_PARAGRAPH_BREAK_RE = re.compile(r'\n[^\S\n]*\n\s*')
+
+_SECTION_HEADER_RE = _compile_linear(
+    r'^(?P<header>' + '|'.join(re.escape(k) + r'\b' for k in PDFProcessor.SECTION_TAGS.keys()) + ')',
+    flags=re.MULTILINE
+)
+
+# Cleaning passes (hyphenation, orphaned footnote markers)
+_HYPHEN_RE = _compile_linear(
+    r'([a-z])-\s*\n\s*([a-z])',
+    flags=re.IGNORECASE
+)
+_ORPHAN_MARKER_RE = re.compile(
+    r'^\s*[*‡†§]|\d+\.?\s*$',
+    flags=re.MULTILINE
+)
+
+# Quote/dash standardization in one translate pass
+_PUNCT_TABLE = str.maketrans({
+    '“': '"', '”': '"',
+    '‘': "'", '’': "'",
+    '—': '--'
+})
+
+
+_worker_processor: Optional[PDFProcessor] = None
+
+def _process_pdf(pdf_path: Path, output_dir: Path, force: bool = False) -> bool:
+    """ProcessPoolExecutor task: one PDFProcessor per worker process, built on first use."""
+    global _worker_processor
+    if _worker_processor is None or _worker_processor.force != force:
+        _worker_processor = PDFProcessor(max_workers=1, force=force)
+    return _worker_processor.process_pdf(pdf_path, output_dir)
+
+
 def main():
     """Command-line interface for the PDF processor."""
     import argparse
@@ -276,6 +397,11 @@ def main():
         default=4,
         help='Number of parallel workers to use (default: 4)'
     )
+    parser.add_argument(
+        '-f', '--force',
+        action='store_true',
+        help='Reprocess PDFs even when their cleaned text is newer'
+    )
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
@@ -287,7 +413,7 @@ def main():
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
-    processor = PDFProcessor(max_workers=args.jobs)
+    processor = PDFProcessor(max_workers=args.jobs, force=args.force)
     input_dir = Path(args.input)
     output_dir = Path(args.output)
     
@@ -0,0 +1,47 @@
+"""
+Word-window slicing shared by the hairball search front ends.
+- Windows are sliced from the original string; no word list is built
+- Only the characters around the match are scanned
+"""
+
+import re
+
+_WORD = re.compile(r"\S+")
+_CHARS_PER_WORD = 8  # Initial backward reach per word; doubled until enough words are seen
+
+def leading_words(text: str, num_words: int) -> str:
+    """The first num_words words of text."""
+    start = end = 0
+    for count, match in enumerate(_WORD.finditer(text), 1):
+        if count == 1:
+            start = match.start()
+        end = match.end()
+        if count >= num_words:
+            break
+    return text[start:end] if num_words > 0 else ""
+
+def word_window(text: str, pos: int, num_words: int) -> str:
+    """About num_words words of text centred on character offset pos."""
+    half = num_words // 2
+    if half <= 0:
+        return ""
+
+    end = pos
+    for count, match in enumerate(_WORD.finditer(text, pos), 1):
+        end = match.end()
+        if count >= half:
+            break
+
+    start = pos
+    reach = half * _CHARS_PER_WORD
+    while True:
+        low = max(0, pos - reach)
+        starts = [match.start() for match in _WORD.finditer(text, low, pos)]
+        # Past the first hit, which may be a word cut in half by low
+        if len(starts) > half or low == 0:
+            if starts:
+                start = starts[-half] if len(starts) >= half else starts[0]
+            break
+        reach *= 2
+
+    return text[start:end]
@@ -7,102 +7,223 @@ Legal Text Processor (TXT → ChromaDB)
 """
 
 import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import chromadb
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline, AutoTokenizer
+from chromadb.config import Settings
+from embedder import DEVICE, load_embedding_model, ModelEmbeddingFunction
+import numpy as np
+import torch
+from keybert import KeyBERT
 from config import (  # Shared config
     CHROMA_PATH,
-    EMBEDDING_MODEL,
+    CHROMA_COLLECTION_METADATA,
+    KEYWORD_MODEL,
     KEYWORD_SETTINGS,
     EXTRACT_WORDS,
-    SUMMARY_MAX_WORDS
-)
-
-# --- Initialize ChromaDB ---
-chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
-embedding_fn = chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction(
-    model_name=EMBEDDING_MODEL
-)
-chroma_collection = chroma_client.get_or_create_collection(
-    name="legal_docs",
-    embedding_function=embedding_fn,
-    metadata={"hnsw:space": "cosine"}
+    SUMMARY_MAX_WORDS,
+    SUMMARIZER_BACKEND,
+    SUMMARY_SCAN_WORDS,
+    SUMMARY_SENTENCES,
+    SUMMARIZER_MODEL,
+    SUMMARIZER_DTYPE,
+    EMBED_BATCH_SIZE,
+    SUMMARY_BATCH_SIZE,
+    READ_WORKERS
 )
 
 # --- Model Initialization ---
+def _fp32_lm_head(model: torch.nn.Module) -> None:
+    """Project the (reduced-precision) last hidden state to logits in float32.
+
+    The head is tied to the shared embeddings, so it gets its own float32 copy
+    rather than upcasting the shared weight in place.
+    """
+    old_head = model.lm_head
+    head = torch.nn.Linear(old_head.in_features, old_head.out_features, bias=False, device=old_head.weight.device)
+    head.weight = torch.nn.Parameter(old_head.weight.detach().float().clone(), requires_grad=False)
+    head.register_forward_pre_hook(lambda _, args: (args[0].float(),))
+    model.lm_head = head
+
 print("Loading models...")
 try:
-    embedding_model = SentenceTransformer(EMBEDDING_MODEL)
-    summarizer = pipeline(
-        "summarization",
-        model="facebook/bart-large-cnn",
-        tokenizer="facebook/bart-large-cnn",
-        device=-1  # CPU
-    )
+    embedding_model = load_embedding_model()
+    if KEYWORD_MODEL:
+        from model2vec import StaticModel
+        keyword_model = StaticModel.from_pretrained(KEYWORD_MODEL)
+    else:
+        keyword_model = embedding_model
+    _KW_MODEL = KeyBERT(model=keyword_model)  # Built once; reused for every batch
+    if SUMMARIZER_BACKEND == "abstractive":
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+        summary_tokenizer = AutoTokenizer.from_pretrained(SUMMARIZER_MODEL)
+        summary_model = AutoModelForSeq2SeqLM.from_pretrained(
+            SUMMARIZER_MODEL,
+            torch_dtype=torch.float16 if DEVICE == "cuda" else getattr(torch, SUMMARIZER_DTYPE)
+        ).to(DEVICE).eval()
+        if summary_model.dtype != torch.float32:
+            _fp32_lm_head(summary_model)
 except Exception as e:
     raise RuntimeError(f"Model loading failed: {str(e)}")
 
+# --- Initialize ChromaDB ---
+chroma_client = chromadb.PersistentClient(path=CHROMA_PATH, settings=Settings(anonymized_telemetry=False))
+embedding_fn = ModelEmbeddingFunction(embedding_model)  # Same weights as the stored embeddings
+chroma_collection = chroma_client.get_or_create_collection(
+    name="legal_docs",
+    embedding_function=embedding_fn,
+    metadata=CHROMA_COLLECTION_METADATA
+)
+
 # --- Helper Functions ---
-def generate_md5(text: str) -> str:
-    return hashlib.md5(text.encode()).hexdigest()
+def generate_doc_id(raw: bytes) -> str:
+    # MD5 of the UTF-8 bytes: matches ids already in legal_docs, so re-runs never duplicate
+    return hashlib.md5(raw).hexdigest()
 
 def extract_first_n_words(text: str, n: int) -> str:
     return " ".join(text.split()[:n])
 
-def legal_summarize(text: str) -> str:
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+def extractive_summarize(texts: List[str]) -> List[str]:
+    """Pick each document's SUMMARY_SENTENCES sentences closest to its centroid.
+
+    Every candidate sentence in the corpus goes through one batched encode;
+    the chosen sentences are returned in document order.
+    """
+    doc_sentences = [
+        [s for s in _SENTENCE_SPLIT.split(extract_first_n_words(text, SUMMARY_SCAN_WORDS)) if s]
+        for text in texts
+    ]
+    flat = [s for sentences in doc_sentences for s in sentences]
+    if not flat:
+        return ["" for _ in texts]
+    vectors = embedding_model.encode(
+        flat,
+        batch_size=EMBED_BATCH_SIZE,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+
+    summaries, offset = [], 0
+    for sentences in doc_sentences:
+        doc_vectors = vectors[offset:offset + len(sentences)]
+        offset += len(sentences)
+        if not sentences:
+            summaries.append("")
+            continue
+        scores = doc_vectors @ doc_vectors.mean(axis=0)
+        keep = sorted(np.argsort(-scores)[:SUMMARY_SENTENCES])
+        summaries.append(extract_first_n_words(" ".join(sentences[i] for i in keep), SUMMARY_MAX_WORDS))
+    return summaries
+
+def abstractive_summarize(texts: List[str]) -> List[str]:
+    """Summarize a batch of documents, SUMMARY_BATCH_SIZE per forward pass.
+
+    The whole corpus is tokenized in one call; each batch is a slice of those
+    tensors, trimmed to its own longest row.
+    """
+    extracts = [extract_first_n_words(text, EXTRACT_WORDS) for text in texts]
+    encoded = summary_tokenizer(extracts, padding=True, truncation=True, return_tensors="pt")
+    summaries = []
+    with torch.inference_mode():
+        for i in range(0, len(extracts), SUMMARY_BATCH_SIZE):
+            attention_mask = encoded["attention_mask"][i:i + SUMMARY_BATCH_SIZE]
+            width = int(attention_mask.sum(dim=1).max())
+            output_ids = summary_model.generate(
+                input_ids=encoded["input_ids"][i:i + SUMMARY_BATCH_SIZE, :width].to(DEVICE),
+                attention_mask=attention_mask[:, :width].to(DEVICE),
+                max_length=SUMMARY_MAX_WORDS,
+                min_length=int(SUMMARY_MAX_WORDS * 0.7),
+                no_repeat_ngram_size=3
+            )
+            summaries.extend(summary_tokenizer.batch_decode(output_ids, skip_special_tokens=True))
+    return [summary.strip() for summary in summaries]
+
+def legal_summarize(texts: List[str]) -> List[str]:
+    """Summarize a batch of documents with the configured SUMMARIZER_BACKEND."""
     try:
-        summary = summarizer(
-            extract_first_n_words(text, EXTRACT_WORDS),
-            max_length=SUMMARY_MAX_WORDS,
-            min_length=int(SUMMARY_MAX_WORDS * 0.7),
-            no_repeat_ngram_size=3,
-            truncation=True
-        )
-        return summary[0]["summary_text"].strip()
+        if SUMMARIZER_BACKEND == "extractive":
+            return extractive_summarize(texts)
+        return abstractive_summarize(texts)
     except Exception as e:
         print(f"Summarization failed: {str(e)}")
-        return extract_first_n_words(text, SUMMARY_MAX_WORDS)
+        return [extract_first_n_words(text, SUMMARY_MAX_WORDS) for text in texts]
 
-def extract_keywords(text: str) -> List[str]:
-    from keybert import KeyBERT
-    kw_model = KeyBERT(model=embedding_model)
-    keywords = kw_model.extract_keywords(text, **KEYWORD_SETTINGS)
-    return [kw[0] for kw in keywords]
+def extract_keywords(texts: List[str]) -> List[List[str]]:
+    """Top keyphrases per text, ranked against that same text's embedding."""
+    keywords = _KW_MODEL.extract_keywords(texts, **KEYWORD_SETTINGS)
+    if len(texts) == 1:  # KeyBERT unwraps single-document results
+        keywords = [keywords]
+    return [[kw[0] for kw in doc_keywords] for doc_keywords in keywords]
 
 # --- Processing Pipeline ---
-def process_file(input_path: Path) -> bool:
+def _read_document(input_path: Path) -> Optional[Tuple[Path, str, str]]:
     try:
-        text = input_path.read_text(encoding="utf-8")
-        doc_id = generate_md5(text)
-        
-        summary = legal_summarize(text)
-        keywords = extract_keywords(summary)
-        
+        raw = input_path.read_bytes()
+        text = raw.decode("utf-8")
+    except Exception as e:
+        print(f"Failed reading {input_path.name}: {str(e)}")
+        return None
+    return input_path, text, generate_doc_id(raw)
+
+def load_documents(input_dir: Path) -> List[Tuple[Path, str, str]]:
+    """Read every .txt up front as (path, text, doc_id); duplicate contents are kept once.
+
+    Reads and hashes run on a thread pool (file I/O and hashlib release the GIL);
+    the models stay loaded once in this process and batch over the whole corpus.
+    """
+    docs: Dict[str, Tuple[Path, str, str]] = {}
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+        for doc in pool.map(_read_document, input_dir.glob("*.txt")):
+            if doc is not None:
+                docs.setdefault(doc[2], doc)
+    return list(docs.values())
+
+def _ingest_chunk(docs: List[Tuple[Path, str, str]]) -> int:
+    """Embed, summarize and keyword one chunk of documents, then add it to Chroma."""
+    texts = [text for _, text, _ in docs]
+    try:
+        with torch.inference_mode():
+            embeddings = embedding_model.encode(
+                texts,
+                batch_size=EMBED_BATCH_SIZE,
+                show_progress_bar=True,
+                convert_to_numpy=True
+            )
+            summaries = legal_summarize(texts)
+            keywords = extract_keywords(summaries)
+
         chroma_collection.add(
-            ids=doc_id,
-            documents=[text],
+            ids=[doc_id for _, _, doc_id in docs],
+            documents=texts,
             metadatas=[{
                 "source_file": input_path.name,
-                "keywords": ", ".join(keywords),
+                "keywords": ", ".join(doc_keywords),
                 "summary": summary
-            }],
-            embeddings=[embedding_model.encode(text).tolist()]
+            } for (input_path, _, _), summary, doc_keywords in zip(docs, summaries, keywords)],
+            embeddings=embeddings.tolist()
         )
-        return True
-        
+        return len(docs)
+
     except Exception as e:
-        print(f"Failed processing {input_path.name}: {str(e)}")
-        return False
+        print(f"Failed processing batch of {len(docs)} files: {str(e)}")
+        return 0
+
+def process_documents(docs: List[Tuple[Path, str, str]]) -> int:
+    """Ingest the corpus in chunks no larger than Chroma's max batch size.
+
+    A failing chunk is reported and skipped; the others are still added.
+    """
+    chunk_size = chroma_client.get_max_batch_size()
+    return sum(_ingest_chunk(docs[i:i + chunk_size]) for i in range(0, len(docs), chunk_size))
 
 # --- Main Execution ---
 if __name__ == "__main__":
     input_dir = Path("./cleaned_texts")
-    processed = sum(
-        1 for f in input_dir.glob("*.txt") 
-        if process_file(f)
-    )
+    processed = process_documents(load_documents(input_dir))
     
     print(f"\nProcessed {processed} files")
-    print(f"Total documents: {chroma_collection.count()}")
\ No newline at end of file
+    print(f"Total documents: {chroma_collection.count()}")